@@ -13,6 +13,7 @@ from PyQt5.QtWidgets import QMainWindow, QApplication, QDesktopWidget
 from ui.main_win_backend import *
 from visualizations import *
 from core_simulator import *
+from indicator_cache import IndicatorCache
 
 ########################################
 
@@ -86,6 +87,7 @@ if __name__ == '__main__':
 
     ### Simulator
     sim = Simulator(comm, vis, 1.2)
+    sim.indicator_cache = IndicatorCache() # indicator outputs are reused by next session
 
     ### User Interface
     ui = UI(sim, vis)
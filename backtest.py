@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import time
+
+import numpy as np
+import pandas as pd
+
+from core_simulator import Simulator
+from indicator_cache import IndicatorCache
+from result_cache import ResultCache
+
+'''
+Headless (batch) backtests driven by run configs.
+Run config is a JSON or YAML file (YAML requires PyYAML), e.g.:
+
+{
+    "name": "example",
+    "data_file": "data/EURUSD/EURUSD60.csv",
+    "tick_data_file": "data/EURUSD/EURUSD1.csv",
+    "start_time": "2019-01-03 00:00",
+    "stop_time": "2019-01-06 00:00",
+    "use_ticks": false,
+    "indicators": [ {"name": "indicator_ex1", "module": "indicators/indicator_example1.py", "parameters": {}} ],
+    "traders":    [ {"name": "trader_ex1", "module": "traders/trader_example1.py", "parameters": {}} ]
+}
+
+Command line usage:
+    python backtest.py config1.json config2.yaml ... [-o OUTPUT_DIR] [-j JOBS] [--cache CACHE_DIR]
+'''
+
+class ModuleConfig:
+    ''' Indicator or trader used in a run - name, module (file path or module name) and its parameters '''
+    def __init__(self, name, module, parameters=None):
+        self.name = name
+        self.module = module
+        self.parameters = {} if parameters is None else parameters
+
+    def to_dict(self):
+        return {'name': self.name, 'module': self.module, 'parameters': self.parameters}
+
+class RunConfig:
+    def __init__(self):
+        self.name = 'backtest'
+        self.data_file = None
+        self.tick_data_file = None
+        self.start_time = None
+        self.stop_time = None
+        self.use_ticks = False
+        self.data_backend = 'numpy'
+        self.tick_data_backend = 'mmap'
+        self.start_balance = 10000.0
+        self.indicator_workers = 0 # threads updating independent indicators in parallel (0 - sequential update)
+        self.indicator_cache_dir = None # directory of indicator output cache (None - outputs are not cached)
+        self.indicators = []
+        self.traders = []
+
+    @staticmethod
+    def from_dict(d):
+        config = RunConfig()
+        for key, value in d.items():
+            if key in ('indicators', 'traders'):
+                try:
+                    setattr(config, key, [ModuleConfig(**module) for module in value])
+                except TypeError:
+                    raise ValueError("[RunConfig] Invalid '{}' field, each entry must have 'name', 'module' and optional 'parameters'".format(key))
+            elif hasattr(config, key):
+                setattr(config, key, value)
+            else:
+                raise ValueError("[RunConfig] Unknown config field: '{}'".format(key))
+        return config
+
+    @staticmethod
+    def load(file: str):
+        with open(file, 'r') as f:
+            if file.endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError('[RunConfig] PyYAML is required to load YAML configs: pip install pyyaml')
+                d = yaml.safe_load(f)
+            else:
+                d = json.load(f)
+        if 'name' not in d:
+            d['name'] = os.path.splitext(os.path.basename(file))[0]
+        return RunConfig.from_dict(d)
+
+    def to_dict(self):
+        d = {key: value for key, value in vars(self).items() if key not in ('indicators', 'traders')}
+        d['start_time'] = str(self.start_time)
+        d['stop_time'] = str(self.stop_time)
+        d['indicators'] = [indicator.to_dict() for indicator in self.indicators]
+        d['traders'] = [trader.to_dict() for trader in self.traders]
+        return d
+
+
+def setup_simulator(config: RunConfig):
+    ''' Headless simulator with data of config loaded (into dm.data and dm.tick_data), without indicators and traders '''
+    sim = Simulator()
+    sim.trader_handler.start_balance = config.start_balance
+    if config.indicator_cache_dir is not None:
+        sim.indicator_cache = IndicatorCache(config.indicator_cache_dir)
+    sim.setup_simulator(config.data_file, pd.Timestamp(config.start_time), pd.Timestamp(config.stop_time), 0,
+                        config.use_ticks, config.tick_data_file, config.data_backend, config.tick_data_backend)
+    if not sim.is_input_valid:
+        raise ValueError("[Backtest] Invalid run config '{}'".format(config.name))
+    return sim
+
+def build_simulator(config: RunConfig, precomputed_outputs=None):
+    '''
+    Headless simulator with data, indicators and traders of config, ready to run.
+    Indicators found in precomputed_outputs (see IndicatorHandler.get_outputs) are not calculated again.
+    '''
+    sim = setup_simulator(config)
+    sim.indicator_handler.max_workers = config.indicator_workers
+    if precomputed_outputs:
+        sim.indicator_handler.precomputed_outputs = precomputed_outputs
+
+    for indicator in config.indicators:
+        sim.add_indicator(indicator.name, indicator.module, indicator.parameters)
+    for trader in config.traders:
+        sim.add_trader(trader.name, trader.module, trader.parameters)
+    return sim
+
+def run_backtest(config: RunConfig, precomputed_outputs=None):
+    ''' Run a single headless simulation described by config, returns BacktestResult '''
+    return build_simulator(config, precomputed_outputs).run_headless()
+
+def get_metrics(result):
+    ''' Summary metrics of a backtest computed from account balance and orders '''
+    balance = result.balance
+    drawdown = np.maximum.accumulate(balance) - balance
+    orders = [order for orders in result.orders.values() for order in orders]
+    return {
+        'bars': len(balance),
+        'start_balance': float(balance[0]),
+        'final_balance': float(balance[-1]),
+        'profit': float(balance[-1] - balance[0]),
+        'max_drawdown': float(drawdown.max()) if len(drawdown) else 0.0,
+        'orders': len(orders),
+    }
+
+def save_result(result, config: RunConfig, output_dir: str, run_time=None):
+    ''' Write balance, orders, indicator outputs (CSV) and summary (JSON) to output_dir '''
+    os.makedirs(output_dir, exist_ok=True)
+
+    pd.DataFrame({'Date': result.time, 'Balance': result.balance}).to_csv(os.path.join(output_dir, 'balance.csv'), index=False)
+
+    indicators = {'Date': result.time}
+    for name, output in result.indicators.items():
+        output = output.reshape(len(result.time), -1)
+        output_names = result.indicator_outputs[name]
+        for i in range(output.shape[1]):
+            indicators[name if output.shape[1] == 1 else '{}_{}'.format(name, output_names[i])] = output[:, i]
+    pd.DataFrame(indicators).to_csv(os.path.join(output_dir, 'indicators.csv'), index=False)
+
+    orders = [{'trader': trader_name, 'id': order.id, 'type': order.type.name, 'status': order.status.name,
+               'amount': order.amount, 'open_time': order.open_time, 'open_price': order.open_price,
+               'close_time': order.close_time, 'close_price': order.close_price,
+               'stop_loss': order.stop_loss, 'take_profit': order.take_profit}
+              for trader_name, trader_orders in result.orders.items() for order in trader_orders]
+    pd.DataFrame(orders, columns=['trader', 'id', 'type', 'status', 'amount', 'open_time', 'open_price', 'close_time',
+                                  'close_price', 'stop_loss', 'take_profit']).to_csv(os.path.join(output_dir, 'orders.csv'), index=False)
+
+    summary = {'config': config.to_dict(), 'metrics': get_metrics(result), 'run_time': run_time}
+    with open(os.path.join(output_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+    return summary
+
+def run_config_file(config_file: str, output_dir: str, cache_dir: str = None, cache_size=1 << 30):
+    '''
+    Load config, run backtest and save results to output_dir/<config name>, returns summary.
+    If cache_dir is given, result is taken from result cache if the same run has been simulated before.
+    '''
+    config = RunConfig.load(config_file)
+    start = time()
+    if cache_dir is None:
+        result = run_backtest(config)
+        cached = False
+    else:
+        cache = ResultCache(cache_dir, cache_size)
+        result = cache.run(config)
+        cached = cache.hits > 0
+    summary = save_result(result, config, os.path.join(output_dir, config.name), time() - start)
+    summary['cached'] = cached
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run headless backtests from JSON/YAML run configs')
+    parser.add_argument('configs', nargs='+', help='run config files (.json, .yaml, .yml)')
+    parser.add_argument('-o', '--output', default='results', help='output directory (default: results)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of configs run concurrently in separate processes')
+    parser.add_argument('--cache', default=None, metavar='CACHE_DIR', help='reuse results of identical runs stored in result cache directory')
+    parser.add_argument('--cache-size', type=int, default=1024, help='max size of result cache in MB (default: 1024)')
+    args = parser.parse_args(argv)
+
+    failed = 0
+    cached = 0
+    if args.jobs <= 1:
+        for config_file in args.configs:
+            try:
+                summary = run_config_file(config_file, args.output, args.cache, args.cache_size << 20)
+                cached += summary['cached']
+                print('[Backtest] {}: {}'.format(config_file, summary['metrics']))
+            except Exception as e:
+                failed += 1
+                print('[Backtest] {} failed: {}'.format(config_file, e))
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = {executor.submit(run_config_file, config_file, args.output, args.cache, args.cache_size << 20): config_file
+                       for config_file in args.configs}
+            for future in as_completed(futures):
+                try:
+                    summary = future.result()
+                    cached += summary['cached']
+                    print('[Backtest] {}: {}'.format(futures[future], summary['metrics']))
+                except Exception as e:
+                    failed += 1
+                    print('[Backtest] {} failed: {}'.format(futures[future], e))
+
+    if args.cache is not None:
+        print('[Backtest] Result cache hits: {}/{}'.format(cached, len(args.configs) - failed))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,19 +1,37 @@
+import io
+import pickle
 import threading
 from time import time, sleep
 from copy import deepcopy
-from math import copysign
 from os.path import exists
 
+import numpy as np
+
 import data_manager as dm
+from indicator import SystemIndicator
 from indicator_handler import IndicatorHandler
 from trader_handler import TraderHandler
-from visualizations import Visualization
 from utils import *
 
 
+class BacktestResult:
+    ''' Result of headless simulation - all arrays cover simulated bars [start_idx, stop_idx] of core data '''
+    def __init__(self, simulator, start_idx):
+        self.start_idx = start_idx
+        self.stop_idx = simulator.frame_data.core_data_idx
+        self.time = simulator.data.time_index[self.start_idx:self.stop_idx+1].view('datetime64[ns]')
+        self.balance = np.array(simulator.trader_handler.get_balance()[self.start_idx:self.stop_idx+1, 0])
+        self.orders = {trader.name: [deepcopy(order) for order in trader.orders.values()]
+                       for trader in simulator.trader_handler.traders.values()}
+        indicators = simulator.indicator_handler.get_named_indicators()
+        self.indicators = {name: np.array(indicator.get_aligned_output(self.start_idx, self.stop_idx))
+                           for name, indicator in indicators.items()}
+        self.indicator_outputs = {name: list(indicator.OUTPUTS) for name, indicator in indicators.items()}
+
+
 class Simulator:
     # TODO: remove interval from init arguments
-    def __init__(self, communication, visualization, interval = 0):
+    def __init__(self, communication=None, visualization=None, interval = 0):
         self.interval = interval
         self.vis = visualization
         self.comm = communication
@@ -27,14 +45,18 @@ class Simulator:
         self.stop_time = None
         self.use_ticks = False
         self.tick_data_idx = -1
+        self.tick_mapping = None
+        self.indicator_cache = None # IndicatorCache used in bar mode (outputs of bars are not final in tick mode)
         self.is_input_valid = False
         self.frame_data = FrameData()
 
         self.indicator_handler = IndicatorHandler()
         self.trader_handler = TraderHandler(self.indicator_handler)
 
-        self.sim_thread = threading.Thread(name = 'myDataLoop', target = self.run, daemon = True)
-        self.sim_thread.start()
+        # simulation loop thread is needed only with visualization, headless simulator is driven by run_headless
+        if self.vis is not None:
+            self.sim_thread = threading.Thread(name = 'myDataLoop', target = self.run, daemon = True)
+            self.sim_thread.start()
 
     @property
     def running(self):
@@ -58,28 +80,26 @@ class Simulator:
     def step_forward(self):
         if not self.running and self.frame_data.time <= self.stop_time:
             self._update_frame_data()
-            self.indicator_handler.update(self.frame_data)
-            self.trader_handler.update(self.frame_data)
+            self._update_handlers()
             self._draw_frame()
 
     def step_backward(self):
         if not self.running and self.frame_data.time >= self.start_time:
             self._update_frame_data(step=-1)
-            self.indicator_handler.update(self.frame_data)
-            self.trader_handler.update(self.frame_data)
+            self._update_handlers()
             self._draw_frame()
 
     def reset(self):
         if self.running:
             print('[Simulator] Cannot reset simulator while running')
         else:
-            self.frame_data.core_data_idx = get_idx_from_time(self.data, self.start_time)
+            self.frame_data.core_data_idx = self.data.get_idx_from_time(self.start_time)
             if self.use_ticks:
-                self.tick_data_idx = get_idx_from_time(self.tick_data, self.start_time)
+                self.tick_data_idx = self.tick_data.get_idx_from_time(self.start_time)
             self.frame_data.curr_candle = None
             # TODO: reset indicators and traders
 
-    def setup_simulator(self, data_file, start_time, stop_time, interval, use_ticks, tick_data_file=None):
+    def setup_simulator(self, data_file, start_time, stop_time, interval, use_ticks, tick_data_file=None, data_backend='pandas', tick_data_backend='pandas'):
         if self.running:
             print('[Simulator] Cannot apply setup while running')
         else:
@@ -95,25 +115,32 @@ class Simulator:
                 print('[Simulator] Interval parameter must be a positive number')
             elif use_ticks and tick_data_file is None:
                 print('[Simulator] Missing tick data')
-            elif not exists(tick_data_file):
+            elif use_ticks and not exists(tick_data_file):
                 print('[Simulator] Cannot find tick data file: %s' % tick_data_file)
             else:
-                self._load_data(data_file)
                 self._set_start_time(start_time)
                 self._set_stop_time(stop_time)
                 self._set_interval(interval)
+                # load only simulated window and bars needed for initialization of indicators and traders
+                # (data is reloaded with more bars if indicators or traders added later need them)
+                warmup = max(self.indicator_handler.warmup, self.trader_handler.warmup)
+                self._load_data(data_file, self.start_time, self.stop_time, warmup, data_backend)
                 self.use_ticks = use_ticks
                 if self.use_ticks:
-                    self._load_tick_data(tick_data_file)
-                    self.tick_data_idx = get_idx_from_time(self.tick_data, self.start_time)
+                    # ticks are loaded from the start of the bar which contains start time
+                    tick_start_time = self.data.Date[self.data.get_idx_from_time(self.start_time, op='LESS_OR_EQUAL')]
+                    self._load_tick_data(tick_data_file, tick_start_time, self.stop_time, tick_data_backend)
+                    self.tick_data_idx = self.tick_data.get_idx_from_time(self.start_time)
+                    self.tick_mapping = dm.TickBarMapping(self.data, self.tick_data)
 
-                self.frame_data.core_data_idx = get_idx_from_time(self.data, self.start_time, op='GREATER_OR_EQUAL')
+                self.frame_data.core_data_idx = self.data.get_idx_from_time(self.start_time, op='GREATER_OR_EQUAL')
                 self.frame_data.time = self.start_time
                 self.frame_data.curr_candle = None
                 self.frame_data.reset = True
 
                 self.is_input_valid = True
 
+                self.indicator_handler.output_cache = None if self.use_ticks else self.indicator_cache
                 self.indicator_handler.set_init_frame(self.frame_data.core_data_idx)
                 self.trader_handler.set_init_frame(self.frame_data.core_data_idx)
                 self._draw_init_frame()
@@ -122,11 +149,11 @@ class Simulator:
     def _set_interval(self, interval):
         self.interval = interval
 
-    def _load_tick_data(self, data_file):
-        self.tick_data.load_data(data_file)
+    def _load_tick_data(self, data_file, start_time=None, stop_time=None, backend='pandas'):
+        self.tick_data.load_data(data_file, backend=backend, start_time=start_time, stop_time=stop_time)
     
-    def _load_data(self, data_file):
-        self.data.load_data(data_file)
+    def _load_data(self, data_file, start_time=None, stop_time=None, warmup=0, backend='pandas'):
+        self.data.load_data(data_file, backend=backend, start_time=start_time, stop_time=stop_time, warmup=warmup)
 
     def _set_start_time(self, time):
         ''' Time should have format yyyy-m[m]-d[d] hh:MM  - or pandas value '''
@@ -137,18 +164,47 @@ class Simulator:
         self.stop_time = time
 
 
-    def add_indicator(self, indicator_name: str, indicator: str, indicator_parameters={}):
-        ind = self.indicator_handler.add_indicator(indicator_name, indicator, indicator_parameters)
-        self.vis.add_plot(ind, ind.parameters.visualization)
-        # self.comm.add_plot_signal.emit(ind, ind.parameters.visualization)
-        self._draw_init_frame() # draw indicator initial frame
+    def add_indicator(self, indicator_name: str, indicator: str, indicator_parameters={}, lazy=False):
+        ''' Lazy indicator is calculated only for bars read by traders (indicator[i]) or plots (get_data) '''
+        indicators_count = len(self.indicator_handler.indicators)
+        ind = self.indicator_handler.add_indicator(indicator_name, indicator, indicator_parameters, lazy)
+        self._extend_warmup()
+        # indicator shared with already added one is already plotted
+        if self.vis is not None and len(self.indicator_handler.indicators) > indicators_count:
+            self.vis.add_plot(ind, ind.parameters.visualization)
+            # self.comm.add_plot_signal.emit(ind, ind.parameters.visualization)
+            self._draw_init_frame() # draw indicator initial frame
+        return ind
     
     def add_trader(self, trader_name: str, trader: str, trader_parameters={}):
         trader = self.trader_handler.add_trader(trader_name, trader, trader_parameters)
-        self.vis.add_plot(trader.buy_orders_data_source, trader.get_buy_vis_params())
-        self.vis.add_plot(trader.sell_orders_data_source, trader.get_sell_vis_params())
-        self.vis.add_plot(trader.buy_pend_orders_data_source, trader.get_buy_vis_params())
-        self.vis.add_plot(trader.sell_pend_orders_data_source, trader.get_sell_vis_params())
+        self._extend_warmup()
+        if self.vis is not None:
+            self.vis.add_plot(trader.buy_orders_data_source, trader.get_buy_vis_params())
+            self.vis.add_plot(trader.sell_orders_data_source, trader.get_sell_vis_params())
+            self.vis.add_plot(trader.buy_pend_orders_data_source, trader.get_buy_vis_params())
+            self.vis.add_plot(trader.sell_pend_orders_data_source, trader.get_sell_vis_params())
+        return trader
+
+    def _extend_warmup(self):
+        '''
+        Data is loaded at setup with default warmup - if indicators or traders added later need more bars before
+        initial frame, data is reloaded with more bars and all of them are initialized again (before simulation starts)
+        '''
+        if not self.is_input_valid:
+            return
+        init_idx = self.data.get_idx_from_time(self.start_time, op='GREATER_OR_EQUAL')
+        warmup = max(self.indicator_handler.warmup, self.trader_handler.warmup)
+        if warmup <= init_idx or self.frame_data.core_data_idx != init_idx or self.data.backend == 'shared':
+            return
+        self._load_data(self.data.data_file, self.start_time, self.stop_time, warmup, self.data.backend)
+        self.frame_data.core_data_idx = self.data.get_idx_from_time(self.start_time, op='GREATER_OR_EQUAL')
+        if self.frame_data.core_data_idx == init_idx:
+            return # there are no more bars before start time
+        if self.use_ticks:
+            self.tick_mapping = dm.TickBarMapping(self.data, self.tick_data)
+        self.indicator_handler.set_init_frame(self.frame_data.core_data_idx)
+        self.trader_handler.set_init_frame(self.frame_data.core_data_idx)
 
     def run(self):
         sleep(1.0) # wait for initialization to finish
@@ -164,8 +220,7 @@ class Simulator:
 
             self._update_frame_data()
 
-            self.indicator_handler.update(self.frame_data)
-            self.trader_handler.update(self.frame_data)
+            self._update_handlers()
 
             # draw frame
             self._draw_frame()
@@ -173,11 +228,117 @@ class Simulator:
             # print("loop time", time()-start_time)
             sleep( max(0.0, self.interval-(time()-start_time) ) )
 
-            if self.frame_data.core_data_idx+1 >= self.data.shape[0] or self.data.Date[self.frame_data.core_data_idx+1] >= self.stop_time:
-                if not self.use_ticks or (self.tick_data_idx+1 >= self.tick_data.shape[0] or self.tick_data.Date[self.tick_data_idx+1] >= self.stop_time):
-                    self.stop()
+            if self._is_last_frame():
+                self.indicator_handler.store_outputs()
+                self.stop()
+
+    def run_headless(self, stop_time=None):
+        '''
+        Run simulation from current frame to stop time as fast as possible - without visualization (no Qt),
+        sleeps, signals and printing. It can be used for backtests on servers and CI. Returns BacktestResult.
+        If stop_time (not later than simulator stop time) is given, simulation stops before it and can be continued later.
+        '''
+        if not self.is_input_valid:
+            print('[Simulator] Simulator cannot run, input parameters are invalid')
+            return None
+        elif self.running:
+            print('[Simulator] Simulator cannot run, already running')
+            return None
+
+        stop_time = self.stop_time if stop_time is None else min(stop_time, self.stop_time)
+        while not self._is_last_frame(stop_time):
+            self._update_frame_data()
+            self._update_handlers()
+        self.indicator_handler.close()
+        self.indicator_handler.store_outputs()
+
+        return BacktestResult(self, self.data.get_idx_from_time(self.start_time, op='GREATER_OR_EQUAL'))
+
+    def save_state(self) -> bytes:
+        '''
+        Snapshot of simulation state - current frame, account balance and state of all indicators and traders.
+        Data (including resampled data of higher timeframes) and precomputed indicator outputs are referenced, not copied. State can be restored by load_state of
+        simulator with the same setup, indicators and traders (added in the same order), e.g. in other process.
+        '''
+        indicators = list(self.indicator_handler.indicators.values())
+        traders = list(self.trader_handler.traders.values())
+        state = {
+            'frame_data': self.frame_data,
+            'tick_data_idx': self.tick_data_idx,
+            'indicator_data_idx': self.indicator_handler.data_idx,
+            'trader_data_idx': self.trader_handler.data_idx,
+            'account_balance': self.trader_handler.account_balance,
+            'indicators': [indicator.__dict__ for indicator in indicators],
+            'traders': [trader.__dict__ for trader in traders]
+        }
+        objects = {id(self.data): ('data', ), id(self.tick_data): ('tick_data', )}
+        objects.update({id(indicator): ('indicator', i) for i, indicator in enumerate(indicators)})
+        objects.update({id(trader): ('trader', i) for i, trader in enumerate(traders)})
+        objects.update({id(output): ('output', key) for key, output in self.indicator_handler.precomputed_outputs.items()})
+        # indicators on higher timeframe keep the same Timeframe (it is a key of update frames) and its data
+        for timeframe, timeframe_data in self.indicator_handler.timeframes.items():
+            objects[id(timeframe_data)] = ('timeframe', timeframe)
+            objects[id(timeframe_data.data)] = ('timeframe_data', timeframe)
+
+        f = io.BytesIO()
+        pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = lambda obj: objects.get(id(obj))
+        pickler.dump(state)
+        return f.getvalue()
+
+    def load_state(self, state: bytes):
+        ''' Restore simulation state saved by save_state '''
+        indicators = list(self.indicator_handler.indicators.values())
+        traders = list(self.trader_handler.traders.values())
+        timeframes = self.indicator_handler.timeframes
+        objects = {'data': self.data, 'tick_data': self.tick_data, 'indicator': indicators, 'trader': traders,
+                   'output': self.indicator_handler.precomputed_outputs, 'timeframe': timeframes,
+                   'timeframe_data': {timeframe: timeframe_data.data for timeframe, timeframe_data in timeframes.items()}}
+
+        unpickler = pickle.Unpickler(io.BytesIO(state))
+        unpickler.persistent_load = lambda pid: objects[pid[0]] if len(pid) == 1 else objects[pid[0]][pid[1]]
+        state = unpickler.load()
+        if len(state['indicators']) != len(indicators) or len(state['traders']) != len(traders):
+            raise ValueError('[Simulator] Saved state does not match indicators and traders of simulator')
+
+        self.frame_data = state['frame_data']
+        self.tick_data_idx = state['tick_data_idx']
+        self.indicator_handler.data_idx = state['indicator_data_idx']
+        self.trader_handler.data_idx = state['trader_data_idx']
+        self.trader_handler.account_balance = state['account_balance']
+        for indicator, indicator_state in zip(indicators, state['indicators']):
+            indicator.__dict__.update(indicator_state)
+        for trader, trader_state in zip(traders, state['traders']):
+            trader.__dict__.update(trader_state)
+
+    def _is_last_frame(self, stop_time=None):
+        stop_time = self.stop_time if stop_time is None else stop_time
+        if self.frame_data.core_data_idx+1 >= self.data.shape[0] or self.data.Date[self.frame_data.core_data_idx+1] >= stop_time:
+            return not self.use_ticks or (self.tick_data_idx+1 >= self.tick_data.shape[0] or self.tick_data.Date[self.tick_data_idx+1] >= stop_time)
+        return False
+
+    def _update_handlers(self):
+        # lazy indicators can be evaluated from GUI thread (plots), which must not see frame update half done
+        with SystemIndicator.lazy_lock:
+            if self.use_ticks:
+                self._update_bars_without_ticks()
+            self.indicator_handler.update(self.frame_data)
+            self.trader_handler.update(self.frame_data)
+
+    def _update_bars_without_ticks(self):
+        ''' Bars without ticks are skipped by tick rollover - handlers are updated with them as completed bars first '''
+        for data_idx in range(self.trader_handler.data_idx + 1, self.frame_data.core_data_idx):
+            frame_data = FrameData()
+            frame_data.core_data_idx = data_idx
+            frame_data.time = self.data.Date[data_idx]
+            frame_data.curr_candle = None
+            frame_data.reset = False
+            self.indicator_handler.update(frame_data)
+            self.trader_handler.update(frame_data)
 
     def _draw_frame(self):
+        if self.comm is None:
+            return
         self.frame_vis_event.wait()
         print(self.frame_data.core_data_idx)
         self.frame_vis_event.clear()
@@ -186,18 +347,11 @@ class Simulator:
     # TODO: optimize (out) iloc
     def _update_frame_data(self, step=1):
         if self.use_ticks:
-            prev_time = self.data.Date[self.frame_data.core_data_idx]
-            next_time = self.data.Date[self.frame_data.core_data_idx + int(copysign(1, step))]     # step is always 1 for core data when using ticks
             self.tick_data_idx += step
-            candle = self.tick_data.iloc[self.tick_data_idx]
-            self.frame_data.time = candle.Date
-            if (step > 0 and self.tick_data.Date[self.tick_data_idx] >= next_time) or \
-               (step < 0 and self.tick_data.Date[self.tick_data_idx] <  prev_time):
-
-                self.frame_data.core_data_idx += int(copysign(1, step))
-                self.frame_data.curr_candle = self._calc_curr_candle(candle, step, True)
-            else:
-                self.frame_data.curr_candle = self._calc_curr_candle(candle, step)
+            self.frame_data.time = self.tick_data.Date[self.tick_data_idx]
+            # bar which contains the tick (bar rollover if it has changed)
+            self.frame_data.core_data_idx = int(self.tick_mapping.tick_to_bar[self.tick_data_idx])
+            self.frame_data.curr_candle = self._calc_curr_candle(self.tick_data_idx)
 
         else:
             self.frame_data.core_data_idx += step
@@ -206,41 +360,16 @@ class Simulator:
         self.frame_data.reset = False
 
 
-    def _calc_curr_candle(self, tick_candle, step, new_frame=False):
-        if step > 0:
-            if self.frame_data.curr_candle is None or new_frame:
-                return Candle(tick_candle.Date, tick_candle.Open, tick_candle.High, tick_candle.Low, tick_candle.Close)
-            else:
-                return Candle(tick_candle.Date, self.frame_data.curr_candle.Open, \
-                                                max(self.frame_data.curr_candle.High, tick_candle.Close), \
-                                                min(self.frame_data.curr_candle.Low, tick_candle.Close), \
-                                                tick_candle.Close )
-        else:
-            prev_time = self.data.Date[self.frame_data.core_data_idx]
-            next_time = self.data.Date[self.frame_data.core_data_idx + 1]
-
-            # find tick idx of candle at prev_time
-            tick_idx = self.tick_data_idx
-            while self.tick_data.Date[tick_idx] > prev_time:
-                tick_idx += step
-            candle = Candle(self.tick_data.Date[tick_idx], self.tick_data.Open[tick_idx], self.tick_data.High[tick_idx],
-                            self.tick_data.Low[tick_idx], self.tick_data.Close[tick_idx])
-
-            # go through the candles from prev_time to current one and build a candle
-            while tick_idx <= self.tick_data_idx:
-                candle.High = max(candle.High, self.tick_data.Close[tick_idx])
-                candle.Low = min(candle.Low, self.tick_data.Close[tick_idx])
-                candle.Close = self.tick_data.Close[tick_idx]
-                tick_idx -= step
-
-            candle.Date = tick_candle.Date
-            return candle
-
+    def _calc_curr_candle(self, tick_idx):
+        ''' In-progress candle of current bar - built from ticks of the bar up to (and including) given tick '''
+        return Candle(dm.to_timestamp(self.frame_data.time), self.tick_mapping.candle_open[tick_idx], self.tick_mapping.candle_high[tick_idx],
+                      self.tick_mapping.candle_low[tick_idx], self.tick_mapping.candle_close[tick_idx])
 
-            
     def _draw_init_frame(self):
+        if self.comm is None:
+            return
         frame_data = FrameData()
-        frame_data.core_data_idx = get_idx_from_time(self.data, self.start_time)
+        frame_data.core_data_idx = self.data.get_idx_from_time(self.start_time)
         frame_data.time = self.start_time
         frame_data.curr_candle = None
         frame_data.reset = True
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import shutil
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+
+'''
+On-disk binary columnar cache of parsed data files.
+Every column of a parsed data file is stored as a separate .npy file (dates as int64 epoch nanoseconds),
+together with a small manifest describing the source file (path, size, mtime, content hash).
+Loading .npy columns is orders of magnitude faster than parsing CSV with dates.
+Several processes can build and read the cache at once - cache is built in its own temporary directory and moved
+into place with atomic rename, directory which may be read by other processes is never removed in place.
+'''
+class DataCache:
+    VERSION = 1
+    MANIFEST = 'manifest.json'
+    HASH_CHUNK_SIZE = 1 << 20
+
+    def __init__(self, source_file: str, cache_dir: str = None):
+        self.source_file = os.path.abspath(source_file)
+        if cache_dir is None:
+            # by default cache is kept next to the data file: <data dir>/.cache/<file name>/
+            cache_dir = os.path.join(os.path.dirname(self.source_file), '.cache')
+        self.path = os.path.join(cache_dir, os.path.basename(self.source_file))
+
+    @property
+    def manifest_file(self):
+        return os.path.join(self.path, DataCache.MANIFEST)
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def content_hash(self):
+        h = hashlib.blake2b(digest_size=16)
+        with open(self.source_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(DataCache.HASH_CHUNK_SIZE), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def source_hash(self, index_col=0) -> str:
+        ''' Content hash of source file - taken from manifest if cache is valid, so the file is not read again '''
+        if self.is_valid(index_col):
+            return self.read_manifest()['hash']
+        return self.content_hash()
+
+    def is_valid(self, index_col=0) -> bool:
+        '''
+        Cache is valid if it was built from the same source file with the same parsing options.
+        Size and mtime are checked first, content hash is computed only if mtime has changed
+        (e.g. file was copied or touched) - in that case manifest is refreshed if content is the same.
+        '''
+        manifest = self.read_manifest()
+        if manifest is None or manifest['version'] != DataCache.VERSION or \
+           manifest['source'] != self.source_file or manifest['index_col'] != index_col:
+            return False
+
+        stat = os.stat(self.source_file)
+        if manifest['size'] != stat.st_size:
+            return False
+        if manifest['mtime_ns'] != stat.st_mtime_ns:
+            if manifest['hash'] != self.content_hash():
+                return False
+            manifest['mtime_ns'] = stat.st_mtime_ns
+            self._write_manifest(manifest)
+
+        return all(os.path.exists(os.path.join(self.path, column['file'])) for column in manifest['columns'])
+
+    def load(self, mmap_mode=None):
+        ''' Returns ordered dict of column arrays {name: np.ndarray}, date columns are datetime64[ns] views '''
+        manifest = self.read_manifest()
+        if manifest is None:
+            raise FileNotFoundError('[DataCache] Cache of {} does not exist'.format(self.source_file))
+        columns = {}
+        for column in manifest['columns']:
+            array = np.load(os.path.join(self.path, column['file']), mmap_mode=mmap_mode)
+            if column['dtype'] == 'datetime64[ns]':
+                array = array.view('datetime64[ns]')
+            columns[column['name']] = array
+        return columns
+
+    def store(self, chunks, index_col=0):
+        '''
+        Store parsed data given as consecutive chunks - dataframes with the same columns and plain integer index
+        (e.g. read with chunksize, or a list with the whole dataframe).
+        Every column is appended chunk by chunk to a raw file which gets .npy header at the end, so the whole data
+        is never held in memory. If valid cache was built by other process in the meantime, it is kept.
+        '''
+        stat = os.stat(self.source_file)
+        manifest = {
+            'version': DataCache.VERSION,
+            'source': self.source_file,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': self.content_hash(),
+            'index_col': index_col,
+            'rows': 0,
+            'columns': []
+        }
+        dtypes = []
+        # cache is built in unique temporary directory next to the cache, other processes never see it half written
+        build_path = '{}.{}.tmp'.format(self.path, uuid4().hex)
+        os.makedirs(build_path)
+        try:
+            for chunk in chunks:
+                if not manifest['columns']:
+                    for i, name in enumerate(chunk.columns):
+                        manifest['columns'].append({'name': str(name), 'dtype': None, 'file': '{}.npy'.format(i)})
+                for i, (column, name) in enumerate(zip(manifest['columns'], chunk.columns)):
+                    array, dtype = DataCache._to_array(chunk[name])
+                    if column['dtype'] is None:
+                        column['dtype'] = dtype
+                        dtypes.append(array.dtype)
+                    elif array.dtype != dtypes[i]:
+                        raise TypeError("[DataCache] Column '{}' changes type from '{}' to '{}'".format(name, dtypes[i], array.dtype))
+                    with open(os.path.join(build_path, column['file'] + '.raw'), 'ab') as f:
+                        np.ascontiguousarray(array).tofile(f)
+                manifest['rows'] += chunk.shape[0]
+
+            for column, dtype in zip(manifest['columns'], dtypes):
+                header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (manifest['rows'],)}
+                raw_file = os.path.join(build_path, column['file'] + '.raw')
+                with open(os.path.join(build_path, column['file']), 'wb') as f:
+                    np.lib.format.write_array_header_1_0(f, header)
+                    with open(raw_file, 'rb') as raw:
+                        shutil.copyfileobj(raw, f)
+                os.remove(raw_file)
+            self._write_manifest(manifest, build_path)
+            self._publish(build_path, index_col)
+        finally:
+            # nothing is left if building failed or cache built by other process is kept
+            shutil.rmtree(build_path, ignore_errors=True)
+
+    def _publish(self, build_path, index_col):
+        ''' Move built cache into place - rename is atomic, it fails if there is cache already '''
+        for _ in range(2):
+            try:
+                os.rename(build_path, self.path)
+                return
+            except OSError:
+                if self.is_valid(index_col):
+                    return # other process has built the same cache
+                self.invalidate()
+        raise OSError('[DataCache] Cannot move built cache to {}'.format(self.path))
+
+    @staticmethod
+    def _to_array(series):
+        ''' Column data as stored (dates as int64 epoch nanoseconds) and its dtype name in manifest '''
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            return series.to_numpy(dtype='datetime64[ns]').view(np.int64), 'datetime64[ns]'
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            array = series.to_numpy()
+            return array, str(array.dtype)
+        raise TypeError("[DataCache] Column '{}' of type '{}' cannot be cached".format(series.name, series.dtype))
+
+    def invalidate(self):
+        ''' Cache directory is renamed first (atomic), so other processes never read it half removed '''
+        removed_path = '{}.{}.removed'.format(self.path, uuid4().hex)
+        try:
+            os.rename(self.path, removed_path)
+        except FileNotFoundError:
+            return
+        shutil.rmtree(removed_path, ignore_errors=True)
+
+    def _write_manifest(self, manifest, path=None):
+        manifest_file = os.path.join(path or self.path, DataCache.MANIFEST)
+        tmp_file = '{}.{}.tmp'.format(manifest_file, uuid4().hex)
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, manifest_file)
@@ -1,20 +1,363 @@
+import numpy as np
 import pandas as pd
 
+from data_cache import DataCache
+from utils import Candle
+
+
+class Column(np.ndarray):
+    ''' NumPy array column with pandas-like 'values' accessor, so it can be used in place of pandas Series '''
+    @property
+    def values(self):
+        return self.view(np.ndarray)
+
+def to_timestamp(value):
+    ''' Single date value as pandas Timestamp (as given by pandas backend), other values are returned as they are '''
+    return pd.Timestamp(value) if isinstance(value, np.datetime64) else value
+
+class Row:
+    '''
+    Single row of ArrayFrame - lightweight replacement of pandas Series, column values are read from underlying arrays on access.
+    Date values are pandas Timestamps, the same as in row of pandas DataFrame.
+    '''
+    __slots__ = ('_columns', '_idx')
+
+    def __init__(self, columns, idx):
+        self._columns = columns
+        self._idx = idx
+
+    def __getattr__(self, key):
+        try:
+            return to_timestamp(self._columns[key][self._idx])
+        except KeyError:
+            raise AttributeError(key)
+
+    def __getitem__(self, key):
+        return to_timestamp(self._columns[key][self._idx])
+
+    def __repr__(self):
+        return 'Row({})'.format(', '.join('{}={}'.format(name, column[self._idx]) for name, column in self._columns.items()))
+
+class _ILocIndexer:
+    def __init__(self, frame):
+        self.frame = frame
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return self.frame.row(item)
+        return self.frame[item]
+
+'''
+Struct-of-arrays data container - every column is a separate NumPy array (or memory mapped file).
+It implements the subset of pandas DataFrame interface used by the simulator, slicing returns views (no copying).
+Dates are stored as datetime64[ns].
+'''
+class ArrayFrame:
+    def __init__(self, columns, index=None):
+        self._columns = {name: column.view(Column) for name, column in columns.items()}
+        length = len(next(iter(self._columns.values()))) if self._columns else 0
+        self._index = range(length) if index is None else index
+        # columns are also set as instance attributes, so column access (e.g. data.Close) is a plain attribute lookup
+        self.__dict__.update(self._columns)
+
+    @staticmethod
+    def from_dataframe(dataframe: pd.DataFrame):
+        columns = {}
+        for name in dataframe.columns:
+            series = dataframe[name]
+            if pd.api.types.is_datetime64_any_dtype(series.dtype):
+                columns[str(name)] = series.to_numpy(dtype='datetime64[ns]')
+            else:
+                columns[str(name)] = np.ascontiguousarray(series.to_numpy())
+        return ArrayFrame(columns)
+
+    @property
+    def columns(self):
+        return list(self._columns.keys())
+
+    @property
+    def shape(self):
+        return (len(self._index), len(self._columns))
+
+    @property
+    def index(self):
+        return np.asarray(self._index)
+
+    @property
+    def iloc(self):
+        return _ILocIndexer(self)
+
+    def row(self, idx):
+        return Row(self._columns, idx if idx >= 0 else idx + len(self._index))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getattr__(self, key):
+        if key.startswith('_'):
+            raise AttributeError(key)
+        try:
+            return self._columns[key]
+        except KeyError:
+            raise AttributeError("'ArrayFrame' object has no attribute '{}'".format(key))
+
+    def __getitem__(self, item):
+        if isinstance(item, str):
+            return self._columns[item]
+        elif isinstance(item, slice):
+            return ArrayFrame({name: column[item] for name, column in self._columns.items()}, self._index[item])
+        elif isinstance(item, list) and all(isinstance(name, str) for name in item):
+            return ArrayFrame({name: self._columns[name] for name in item}, self._index)
+        else:
+            # boolean mask or integer array
+            item = np.asarray(item)
+            return ArrayFrame({name: column[item] for name, column in self._columns.items()}, self.index[item])
+
+    def reset_index(self, drop=True, inplace=False):
+        if inplace:
+            self._index = range(len(self._index))
+        else:
+            return ArrayFrame(self._columns)
+
+
 '''
 This class takes care of data menagement, it also serves as a wrapper around a library used for data processing.
 Only this class is dependant on data structure and framework used to process data
 '''
 class DataManager:
+    CHUNK_SIZE = 100000
+
     def __init__(self, data=None):
         self.data = data
         self.data_file = ""
+        self.backend = None
+        self.window = (None, None, 0)
+        self._time_index = None
 
-    def load_data(self, file: str, index_col=0) -> None:
-        if (self.data_file != file):
-            self.data = pd.read_csv(file, index_col=index_col, parse_dates=True)
+    def load_data(self, file: str, index_col=0, use_cache=True, backend='pandas',
+                  start_time=None, stop_time=None, warmup=0) -> None:
+        '''
+        Load data from CSV file. If use_cache is set, parsed data is stored in binary columnar cache
+        next to the data file and reused on next load as long as the data file has not changed.
+        Backend can be:
+         - 'pandas' - data is loaded into pandas DataFrame
+         - 'numpy'  - data is loaded into ArrayFrame - every column is contiguous NumPy array, scalar access
+                      (e.g. data.Close[idx]) and row access (data[idx]) avoid pandas indexing machinery
+         - 'mmap'   - cached column files are memory mapped read-only (ArrayFrame), data is not read into memory
+                      upfront, only touched pages are resident and page cache is shared between processes
+        If start_time or stop_time is given, only rows in [start_time, stop_time] are kept, together with
+        'warmup' rows before start_time and one row after stop_time (needed to detect the end of the last bar).
+        Data is not reloaded if the same file is already loaded with a window containing the requested one.
+        Data attached from shared memory (see shared_data module) is used for any backend.
+        '''
+        if backend not in ('pandas', 'numpy', 'mmap'):
+            raise ValueError("backend parameter value must be one of the following: ['pandas', 'numpy', 'mmap']")
+
+        start_time = None if start_time is None else pd.Timestamp(start_time)
+        stop_time = None if stop_time is None else pd.Timestamp(stop_time)
+        window = (start_time, stop_time, warmup)
+        if not self._is_loaded(file, backend, window):
+            self.data = self._read(file, index_col, use_cache, backend, window)
+            self._time_index = None
             self.data_file = file
-            # use plain integer index => in order to remove time gaps and easier plot of indicators
-            self.data = self.data.reset_index(drop=False)
+            self.backend = backend
+            self.window = window
+
+    def invalidate_cache(self, file: str = None) -> None:
+        ''' Remove cached binary data of given file (or currently loaded file) '''
+        DataCache(file or self.data_file).invalidate()
+
+    def rebuild_cache(self, file: str = None, index_col=0) -> None:
+        ''' Parse given file (or currently loaded file) and rebuild its cache, loaded data is refreshed '''
+        file = file or self.data_file
+        cache = DataCache(file)
+        cache.invalidate()
+        cache.store(self._read_csv_chunks(file, index_col), index_col)
+        if file == self.data_file:
+            backend = 'numpy' if self.backend == 'shared' else self.backend
+            self.data = self._read(file, index_col, True, backend, self.window)
+            self.backend = backend
+            self._time_index = None
+
+    def to_array_frame(self, start=0, stop=None) -> ArrayFrame:
+        ''' Rows [start, stop) in chronological order as ArrayFrame of NumPy arrays (views of loaded data if possible) '''
+        if isinstance(self.data, ArrayFrame):
+            return self.data[start:stop]
+        return ArrayFrame({str(name): np.asarray(self.data[name])[start:stop] for name in self.data.columns})
+
+    @property
+    def time_index(self) -> np.ndarray:
+        ''' Sorted int64 array of data times (epoch nanoseconds), built once per loaded data '''
+        if self._time_index is None:
+            self._time_index = np.asarray(self.data['Date']).astype('datetime64[ns]').view(np.int64)
+        return self._time_index
+
+    def get_idx_from_time(self, time, op='EQUAL') -> int:
+        '''
+        Get row index from given time - binary search over sorted time index, O(log n).
+        op parameter can be EQUAL, GREATER_OR_EQUAL or LESS_OR_EQUAL - to search for appropriate idx
+        '''
+        value = DataManager._to_ns(time)
+        side = 'right' if op == 'LESS_OR_EQUAL' else 'left'
+        pos = int(np.searchsorted(self.time_index, value, side=side))
+        return self._get_idx_from_position(pos, time, value, op)
+
+    def get_idx_from_time_and_hint(self, time, hint, op='LESS_OR_EQUAL') -> int:
+        '''
+        Same as get_idx_from_time, but search starts from hint index (e.g. current index) and gallops
+        (exponentially increases step) towards searched time, so cost is O(log distance) instead of O(log n).
+        '''
+        times = self.time_index
+        value = DataManager._to_ns(time)
+        side = 'right' if op == 'LESS_OR_EQUAL' else 'left'
+        n = len(times)
+        hint = min(max(int(hint), 0), n - 1)
+
+        # find range [lo, hi] which contains insertion position of searched time
+        is_before = (lambda i: times[i] <= value) if side == 'right' else (lambda i: times[i] < value)
+        step = 1
+        if is_before(hint):
+            lo = hint + 1
+            hi = lo + step
+            while hi < n and is_before(hi):
+                lo = hi + 1
+                step *= 2
+                hi = lo + step
+            hi = min(hi, n)
+        else:
+            hi = hint
+            lo = hi - step
+            while lo > 0 and not is_before(lo):
+                hi = lo
+                step *= 2
+                lo = hi - step
+            lo = max(lo, 0)
+
+        pos = lo + int(np.searchsorted(times[lo:hi], value, side=side))
+        return self._get_idx_from_position(pos, time, value, op)
+
+    def _get_idx_from_position(self, pos, time, value, op):
+        if op == 'EQUAL':
+            if pos >= len(self.time_index) or self.time_index[pos] != value:
+                raise IndexError('[DataManager] Time {} not found in data'.format(time))
+            return pos
+        elif op == 'GREATER_OR_EQUAL':
+            if pos >= len(self.time_index):
+                raise IndexError('[DataManager] No data at or after time {}'.format(time))
+            return pos
+        elif op == 'LESS_OR_EQUAL':
+            if pos == 0:
+                raise IndexError('[DataManager] No data at or before time {}'.format(time))
+            return pos - 1
+        else:
+            raise ValueError('op parameter value must be one of the following: '
+            '[\'EQUAL\', \'GREATER_OR_EQUAL\', \'LESS_OR_EQUAL\'')
+
+    @staticmethod
+    def _to_ns(time) -> int:
+        return pd.Timestamp(time).value
+
+    def _is_loaded(self, file, backend, window):
+        if self.data_file != file or (self.backend != backend and self.backend != 'shared'):
+            return False
+        start_time, stop_time, warmup = window
+        loaded_start_time, loaded_stop_time, loaded_warmup = self.window
+        if loaded_start_time is not None:
+            if start_time is None or start_time < loaded_start_time:
+                return False
+            # rows loaded before start_time must cover warmup - unless loaded data already starts at the start of file
+            rows_before = int(np.searchsorted(self.time_index, self._to_ns(start_time), side='left'))
+            loaded_rows_before = int(np.searchsorted(self.time_index, self._to_ns(loaded_start_time), side='left'))
+            if rows_before < warmup and loaded_rows_before >= loaded_warmup:
+                return False
+        if loaded_stop_time is not None and (stop_time is None or stop_time > loaded_stop_time):
+            return False
+        return True
+
+    def _read(self, file, index_col, use_cache, backend, window):
+        if backend == 'mmap':
+            return self._read_mmap(file, index_col, window)
+
+        columns = self._read_cached(file, index_col, window) if use_cache else None
+        if columns is None:
+            data = self._read_csv(file, index_col, window)
+            return ArrayFrame.from_dataframe(data) if backend == 'numpy' else data
+        elif backend == 'numpy':
+            return ArrayFrame(columns)
+        else:
+            return pd.DataFrame(columns, copy=False)
+
+    def _read_csv(self, file: str, index_col=0, window=(None, None, 0)):
+        start_time, stop_time, warmup = window
+        if start_time is None and stop_time is None:
+            data = pd.read_csv(file, index_col=index_col, parse_dates=True)
+        else:
+            # read file in chunks and keep only rows inside of the window
+            warmup_data = None
+            chunks = []
+            for chunk in pd.read_csv(file, index_col=index_col, parse_dates=True, chunksize=DataManager.CHUNK_SIZE):
+                if start_time is not None:
+                    before = chunk[chunk.index < start_time]
+                    if warmup > 0 and before.shape[0] > 0:
+                        warmup_data = before if warmup_data is None else pd.concat([warmup_data, before])
+                        warmup_data = warmup_data.iloc[-warmup:]
+                    chunk = chunk[chunk.index >= start_time]
+                if stop_time is not None:
+                    n = chunk.index.searchsorted(stop_time, side='right')
+                    chunks.append(chunk.iloc[:n+1])
+                    if n < chunk.shape[0]:
+                        break
+                else:
+                    chunks.append(chunk)
+            if warmup_data is not None:
+                chunks.insert(0, warmup_data)
+            data = pd.concat(chunks)
+        # use plain integer index => in order to remove time gaps and easier plot of indicators
+        return data.reset_index(drop=False)
+
+    def _read_csv_chunks(self, file: str, index_col=0):
+        ''' Whole file parsed in chunks of CHUNK_SIZE rows (used to build cache without holding the file in memory) '''
+        for chunk in pd.read_csv(file, index_col=index_col, parse_dates=True, chunksize=DataManager.CHUNK_SIZE):
+            yield chunk.reset_index(drop=False)
+
+    def _read_cached(self, file: str, index_col=0, window=(None, None, 0)):
+        ''' Returns in-memory column arrays of given window read from cache (cache is built if needed) '''
+        columns = self._load_cache(file, index_col)
+        if columns is None:
+            return None
+        # read only window from memory mapped columns
+        lo, hi = self._get_window_bounds(columns['Date'], window)
+        return {name: np.array(column[lo:hi]) for name, column in columns.items()}
+
+    def _read_mmap(self, file: str, index_col=0, window=(None, None, 0)):
+        columns = self._load_cache(file, index_col)
+        if columns is None:
+            return ArrayFrame.from_dataframe(self._read_csv(file, index_col, window))
+        lo, hi = self._get_window_bounds(columns['Date'], window)
+        return ArrayFrame({name: column[lo:hi] for name, column in columns.items()})
+
+    def _load_cache(self, file: str, index_col=0):
+        ''' Memory mapped cached columns (cache is built if needed), None if cache cannot be built or read '''
+        cache = DataCache(file)
+        try:
+            if not cache.is_valid(index_col):
+                cache.store(self._read_csv_chunks(file, index_col), index_col)
+            return cache.load(mmap_mode='r')
+        except (OSError, TypeError, ValueError, EOFError) as e:
+            # e.g. cache was replaced by other process while being read - data is parsed from data file instead
+            print('[DataManager] Cannot cache data file {}: {}'.format(file, e))
+            return None
+
+    @staticmethod
+    def _get_window_bounds(dates, window):
+        start_time, stop_time, warmup = window
+        lo = 0
+        hi = len(dates)
+        if start_time is not None:
+            lo = max(0, int(np.searchsorted(dates, start_time.to_datetime64(), side='left')) - warmup)
+        if stop_time is not None:
+            hi = min(hi, int(np.searchsorted(dates, stop_time.to_datetime64(), side='right')) + 1)
+        return lo, hi
 
     '''
     Dereference operator - []
@@ -22,9 +365,11 @@ class DataManager:
     since it should be used as normal int, float, datetime or some other data type
     '''
     def __getitem__(self, item):
-        if type(item) == int and type(self.data) != pd.DataFrame:
+        if type(item) == int and not isinstance(self.data, (pd.DataFrame, ArrayFrame)):
             return self.data[item]
-        elif type(item) == int and type(self.data) == pd.DataFrame:
+        elif type(item) == int and type(self.data) == ArrayFrame:
+            return self.data.row(item)
+        elif type(item) == int:
             return self.data.iloc[item]
         else:
             return DataManager(self.data[item])
@@ -34,9 +379,9 @@ class DataManager:
     '''
     def __getattr__(self, key):
         if key == 'index':
-            return self.data.__getattr__(key).values
+            return np.asarray(getattr(self.data, key))
         else:
-            return self.data.__getattr__(key)
+            return getattr(self.data, key)
 
     '''
     Operators
@@ -60,34 +405,159 @@ class DataManager:
     def reverse(self):
         self.data = self.data[::-1]
         self.data.reset_index(inplace=True, drop=True)
+        self._time_index = None
 
 '''
 This class is used as interface to access data in user code
-It is a wrapper around pandas DataFrame, current candle is a DataFrame with a single entry
+It presents data in reversed order - index 0 is the latest bar (end_idx) and index i is bar end_idx-i.
+Reversed order is achieved with offset arithmetic over the underlying DataManager, so no data is copied.
+If current candle (in-progress bar) is given, it replaces the latest bar at index 0.
 '''
 class DataView:
-    def __init__(self, dataframe, current_candle = None):
-        self.dataframe = dataframe
+    def __init__(self, data, end_idx, current_candle = None, start_idx = 0):
+        self.data = data
+        self.end_idx = end_idx
+        self.start_idx = start_idx
         self.current_candle = current_candle
 
+    def __len__(self):
+        return max(0, self.end_idx - self.start_idx + 1)
+
     def __getitem__(self, item):
-        if type(item) == int:
-            if self.current_candle is None:
-                return self.dataframe.iloc[item]    
-            elif item == 0:
+        if isinstance(item, (int, np.integer)):
+            if item < 0:
+                item += len(self)
+            if item < 0 or item >= len(self):
+                raise IndexError("DataView index out of range")
+            if item == 0 and self.current_candle is not None:
                 return self.current_candle
-            else:
-                return self.dataframe.iloc[item-1]
+            return self.data[int(self.end_idx - item)]
         elif type(item) == slice:
-            if self.current_candle is None:
-                return DataView(self.dataframe[item])
-            elif item.start == 0:
-                return DataView(self.dataframe[item.start+1:item.stop], self.current_candle)
-            else:
-                return DataView(self.dataframe[item])
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                raise ValueError("DataView slice step is not supported.")
+            stop = max(start, stop)
+            current_candle = self.current_candle if start == 0 else None
+            return DataView(self.data, self.end_idx - start, current_candle, self.end_idx - stop + 1)
         else:
             raise TypeError("Invalid argument type.")
 
+    def window(self, lookback):
+        ''' View of the last lookback bars (nothing is copied), the whole view if lookback is None '''
+        return self if lookback is None or lookback >= len(self) else self[:lookback]
+
+'''
+Mapping between ticks and bars of core data (or any finer and coarser data series), built once with vectorized binary search.
+Bar contains all ticks from its time (inclusive) to the time of the next bar (exclusive).
+It also holds in-progress candle of the bar at every tick, so candle at any tick is a single array lookup.
+'''
+class TickBarMapping:
+    def __init__(self, data: DataManager, tick_data: DataManager):
+        bar_times = data.time_index
+        tick_times = tick_data.time_index
+        # index of bar which contains tick (-1 if tick is before the first bar)
+        self.tick_to_bar = np.searchsorted(bar_times, tick_times, side='right') - 1
+        # first tick index of every bar
+        self.bar_first_tick = np.searchsorted(tick_times, bar_times, side='left')
+
+        # in-progress candle of the bar at every tick: open of the first tick of the bar, running high/low
+        # (high/low of the first tick, then close of following ticks) and close of the tick
+        first_tick = self.bar_first_tick[np.maximum(self.tick_to_bar, 0)]
+        is_first_tick = np.arange(len(tick_times)) == first_tick
+        close = np.asarray(tick_data.Close, dtype=np.float64)
+        high = np.where(is_first_tick, np.asarray(tick_data.High, dtype=np.float64), close)
+        low = np.where(is_first_tick, np.asarray(tick_data.Low, dtype=np.float64), close)
+        self.candle_open = np.asarray(tick_data.Open, dtype=np.float64)[np.minimum(first_tick, len(tick_times) - 1)]
+        self.candle_high = pd.Series(high).groupby(self.tick_to_bar).cummax().to_numpy()
+        self.candle_low = pd.Series(low).groupby(self.tick_to_bar).cummin().to_numpy()
+        self.candle_close = close
+
+'''
+Higher timeframe (e.g. '4h' or 'D' over hourly bars) resampled from core data once, with vectorized grouping.
+Higher timeframe bar contains all base bars from its time (start of period) to the time of the next bar.
+Its in-progress candle at any base bar is built only from base bars up to that bar (running high/low are
+precomputed, so it is a single array lookup) - indicators on higher timeframe never see base bars after current one.
+Timeframe is a pandas frequency string - fixed ('30min', '4h', 'D') or calendar based ('W', 'M').
+'''
+class Timeframe:
+    def __init__(self, data: DataManager, timeframe: str):
+        self.timeframe = timeframe
+        self.base = data
+        times = data.time_index
+        bar_start = Timeframe._get_period_start(times, timeframe)
+
+        # higher timeframe bar of every base bar, first and last base bar of every higher timeframe bar
+        is_first = np.concatenate([[True], bar_start[1:] != bar_start[:-1]])
+        self.base_to_bar = np.cumsum(is_first) - 1
+        self.bar_first = np.flatnonzero(is_first)
+        self.bar_last = np.append(self.bar_first[1:], len(times)) - 1
+
+        # base bar completes higher timeframe bar if the period ends with it, or if there are no more bars
+        # in the period (e.g. week ends with Friday bar) - except the last loaded bar, its period can continue
+        step = int(np.median(np.diff(times))) if len(times) > 1 else 0
+        self.is_last = Timeframe._get_period_start(times + step, timeframe) != bar_start
+        self.is_last[self.bar_last[:-1]] = True
+        # the last higher timeframe bar completed at every base bar (-1 if there is none)
+        self.completed_bar = np.where(self.is_last, self.base_to_bar, self.base_to_bar - 1)
+
+        self.open = np.asarray(data.Open, dtype=np.float64)
+        self.high = np.asarray(data.High, dtype=np.float64)
+        self.low = np.asarray(data.Low, dtype=np.float64)
+        self.close = np.asarray(data.Close, dtype=np.float64)
+        self.candle_high = pd.Series(self.high).groupby(self.base_to_bar).cummax().to_numpy()
+        self.candle_low = pd.Series(self.low).groupby(self.base_to_bar).cummin().to_numpy()
+
+        columns = {
+            'Date': bar_start[self.bar_first].view('datetime64[ns]'),
+            'Open': self.open[self.bar_first],
+            'High': np.maximum.reduceat(self.high, self.bar_first) if len(times) else self.high,
+            'Low': np.minimum.reduceat(self.low, self.bar_first) if len(times) else self.low,
+            'Close': self.close[self.bar_last],
+        }
+        if 'Volume' in data.columns:
+            columns['Volume'] = np.add.reduceat(np.asarray(data.Volume), self.bar_first) if len(times) else np.asarray(data.Volume)
+        self.data = DataManager(ArrayFrame(columns))
+        self.data.data_file = data.data_file
+
+    def get_base_bars(self, n):
+        ''' Number of base bars covering in-progress bar and n bars of higher timeframe before it (longest bar is assumed) '''
+        bar_size = int(np.max(self.bar_last - self.bar_first)) + 1 if len(self.bar_first) else 1
+        return (n + 1) * bar_size
+
+    def get_input_data(self, base_idx, current_candle=None):
+        '''
+        Input data of higher timeframe at base bar base_idx - its bar is replaced by in-progress candle unless base bar
+        completes it. Current candle is in-progress base bar (tick mode), it completes nothing.
+        '''
+        idx = int(self.base_to_bar[base_idx])
+        if current_candle is None and self.is_last[base_idx]:
+            return DataView(self.data, idx)
+        return DataView(self.data, idx, self.get_candle(base_idx, current_candle))
+
+    def get_candle(self, base_idx, current_candle=None):
+        ''' In-progress candle of higher timeframe bar built from base bars up to base_idx (last one can be in-progress) '''
+        idx = self.base_to_bar[base_idx]
+        if current_candle is None:
+            open, high, low, close = self.open[base_idx], self.high[base_idx], self.low[base_idx], self.close[base_idx]
+        else:
+            open, high, low, close = current_candle.Open, current_candle.High, current_candle.Low, current_candle.Close
+        if base_idx > self.bar_first[idx]:
+            open = self.open[self.bar_first[idx]]
+            high = max(high, self.candle_high[base_idx-1])
+            low = min(low, self.candle_low[base_idx-1])
+        return Candle(to_timestamp(self.data.Date[idx]), open, high, low, close)
+
+    @staticmethod
+    def _get_period_start(times, timeframe):
+        ''' Start of period (epoch nanoseconds) containing every time '''
+        index = pd.DatetimeIndex(np.asarray(times).view('datetime64[ns]'))
+        try:
+            start = index.floor(timeframe)
+        except ValueError:
+            # calendar based frequency (week, month) has no fixed length
+            start = index.to_period(timeframe).start_time
+        return np.asarray(start.as_unit('ns')).view(np.int64)
+
 
 data = DataManager()
 tick_data = DataManager()
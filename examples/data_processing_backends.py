@@ -0,0 +1,53 @@
+import os
+import sys
+from time import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_manager import DataManager, ArrayFrame, DataView
+
+
+#################################
+print('# Benchmark hot-path data access: pandas DataFrame vs NumPy struct-of-arrays (ArrayFrame)')
+
+N = 500000
+close = 1.13 + np.cumsum(np.random.normal(0, 0.0005, N))
+dataframe = pd.DataFrame({'Date': pd.date_range('2000-01-01', periods=N, freq='min'),
+                          'Open': close, 'High': close + 0.0002, 'Low': close - 0.0002, 'Close': close})
+
+backends = {'pandas': DataManager(dataframe), 'numpy': DataManager(ArrayFrame.from_dataframe(dataframe))}
+indexes = np.random.randint(0, N, 10000).tolist()
+
+print('Data size: %d | Accesses: %d' % (N, len(indexes)))
+
+##############################################
+
+for name, data in backends.items():
+    print()
+
+    start = time()
+    for idx in indexes:
+        date = data.Date[idx]
+    t = (time() - start) / len(indexes)
+    print("[%s] Scalar access ( data.Date[idx] ): %.9f" % (name, t))
+
+    start = time()
+    for idx in indexes:
+        row = data.iloc[idx]
+    t = (time() - start) / len(indexes)
+    print("[%s] Row access ( data.iloc[idx] ): %.9f" % (name, t))
+
+    start = time()
+    for idx in indexes:
+        close = DataView(data, idx)[0].Close
+    t = (time() - start) / len(indexes)
+    print("[%s] User code access ( data[0].Close ): %.9f" % (name, t))
+
+
+
+##############################################
+# CONCLUSION:
+# ArrayFrame scalar and row access is plain NumPy indexing, which is orders of magnitude faster
+# than going through pandas indexing machinery.
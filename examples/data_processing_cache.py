@@ -0,0 +1,59 @@
+import os
+import sys
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_manager import DataManager
+
+
+#################################
+print('# Benchmark loading data from CSV (cold) vs binary columnar cache (warm)')
+
+data_file = 'data/EURUSD/EURUSD1.csv'
+
+##############################################
+
+# Cold load - parsing CSV and building cache
+
+DataManager().invalidate_cache(data_file)
+
+data = DataManager()
+start = time()
+data.load_data(data_file)
+t = time() - start
+print('Data size: %d' % len(data))
+print("Cold load (parse CSV + build cache): %f" % t)
+del data
+
+# Parsing CSV only, without cache
+
+data = DataManager()
+start = time()
+data.load_data(data_file, use_cache=False)
+t = time() - start
+print("Parse CSV without cache: %f" % t)
+del data
+
+##############################################
+
+# Warm load - reading from cache
+
+data = DataManager()
+start = time()
+data.load_data(data_file)
+t = time() - start
+print("Warm load (from cache): %f" % t)
+
+# Loaded data is the same
+
+reference = DataManager()
+reference.load_data(data_file, use_cache=False)
+print("Cached data equals parsed data: %s" % (data.data.astype({'Date': 'datetime64[ns]'}).equals(reference.data.astype({'Date': 'datetime64[ns]'}))))
+del data, reference
+
+
+
+##############################################
+# CONCLUSION:
+# Warm load reads raw column arrays and skips text and date parsing entirely,
+# so it is an order of magnitude (or more) faster than parsing CSV.
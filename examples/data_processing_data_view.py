@@ -0,0 +1,59 @@
+import os
+import sys
+from time import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_manager import DataManager, DataView
+
+
+#################################
+print('# Benchmark per-frame cost of reversed input data: slice + reverse() vs DataView')
+
+# Synthetic data - 500k bars
+
+N = 500000
+close = 1.13 + np.cumsum(np.random.normal(0, 0.0005, N))
+data = DataManager(pd.DataFrame({'Date': pd.date_range('2000-01-01', periods=N, freq='min'),
+                                 'Open': close, 'High': close + 0.0002, 'Low': close - 0.0002, 'Close': close}))
+
+print('Data size: %d' % len(data))
+
+REPEAT = 20
+
+##############################################
+
+# Slicing history and reversing it (copy) on every frame
+
+for idx in [1000, 100000, 250000, N-1]:
+    start = time()
+    for i in range(REPEAT):
+        input_data = data[0:idx+1]
+        input_data.reverse()
+        close = input_data[0].Close
+    t = (time() - start) / REPEAT
+    print("Slice + reverse() at bar %d: %f" % (idx, t))
+
+print()
+
+##############################################
+
+# Reversed view over data (no copying) on every frame
+
+for idx in [1000, 100000, 250000, N-1]:
+    start = time()
+    for i in range(REPEAT):
+        input_data = DataView(data, idx)
+        close = input_data[0].Close
+    t = (time() - start) / REPEAT
+    print("DataView at bar %d: %f" % (idx, t))
+
+
+
+##############################################
+# CONCLUSION:
+# DataView cost does not depend on bar index - it only stores offsets into the underlying data.
+# Slice + reverse() creates new frame and index on every call; without copy-on-write (pandas < 3)
+# it copies the whole history, so its cost grows linearly with bar index (O(N^2) backtest).
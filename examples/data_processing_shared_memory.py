@@ -0,0 +1,61 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_manager as dm
+from data_manager import ArrayFrame, DataManager
+from shared_data import SharedData, attach
+
+
+#################################
+N = 2000000
+WORKERS = 4
+
+def private_memory():
+    ''' Private (not shared) resident memory of current process in MB - Linux only '''
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('RssAnon')) / 1024
+
+def own_copy(data):
+    dm.data = DataManager(ArrayFrame.from_dataframe(data))
+    return float(dm.data.Close.sum()), private_memory()
+
+def attached(handle):
+    attach(handle)
+    return float(dm.data.Close.sum()), private_memory()
+
+if __name__ == '__main__':
+    print('# Benchmark worker data setup: every worker builds its own copy vs attaching to shared memory')
+
+    close = 1.13 + np.cumsum(np.random.normal(0, 0.0005, N))
+    dataframe = pd.DataFrame({'Date': pd.date_range('2000-01-01', periods=N, freq='min'),
+                              'Open': close, 'High': close + 0.0002, 'Low': close - 0.0002, 'Close': close, 'Volume': close})
+    print('Data size: %d rows (%.1f MB) | Workers: %d' % (N, dataframe.memory_usage().sum() / 2**20, WORKERS))
+
+    with ProcessPoolExecutor(WORKERS, mp_context=get_context('spawn')) as executor:
+        executor.submit(int).result() # start workers
+        start = time()
+        results = list(executor.map(own_copy, [dataframe] * WORKERS))
+        t = time() - start
+    print('[copy] Setup time: %f | Private memory per worker: %.1f MB' % (t, np.mean([r[1] for r in results])))
+
+    with SharedData(DataManager(dataframe)) as shared, ProcessPoolExecutor(WORKERS, mp_context=get_context('spawn')) as executor:
+        executor.submit(int).result()
+        start = time()
+        results = list(executor.map(attached, [shared.handle] * WORKERS))
+        t = time() - start
+    print('[shared] Setup time: %f | Private memory per worker: %.1f MB' % (t, np.mean([r[1] for r in results])))
+
+
+
+##############################################
+# CONCLUSION:
+# A private copy has to be pickled, sent and unpickled by every worker and memory used by data is
+# multiplied by number of workers. Attaching to shared memory costs the same regardless of data size
+# and data pages are shared by all workers (they are not counted as private memory).
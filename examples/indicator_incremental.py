@@ -0,0 +1,63 @@
+import os
+import sys
+from collections import deque
+from time import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_manager as dm
+from data_manager import ArrayFrame, DataView
+from indicator import SystemIndicator
+
+
+#################################
+print('# Benchmark per-bar indicator update: calculate over history vs incremental on_bar')
+
+N = 20000
+close = 1.13 + np.cumsum(np.random.normal(0, 0.0005, N))
+dm.data.data = ArrayFrame.from_dataframe(pd.DataFrame({'Date': pd.date_range('2000-01-01', periods=N, freq='min'),
+                                                       'Open': close, 'High': close, 'Low': close, 'Close': close}))
+
+class Sma(SystemIndicator):
+    WARMUP = 500
+    def calculate(self, data):
+        n = min(self.period, len(data))
+        return [sum(data[i].Close for i in range(n)) / n]
+
+class SmaIncremental(SystemIndicator):
+    WARMUP = 500
+    def reset_state(self):
+        self.window = deque()
+        self.total = 0.0
+
+    def on_bar(self, bar, replace):
+        if replace:
+            self.total -= self.window.pop()
+        self.window.append(bar.Close)
+        self.total += bar.Close
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        return self.total / len(self.window)
+
+init_idx = 1000
+bars = 5000
+
+for period in [10, 100, 500]:
+    print()
+    for indicator_class in [Sma, SmaIncremental]:
+        indicator = indicator_class('sma', {'period': period})
+        indicator.init(init_idx)
+        start = time()
+        for idx in range(init_idx + 1, init_idx + bars + 1):
+            indicator.update(DataView(dm.data, idx), idx)
+        t = (time() - start) / bars
+        print('[%s] Period: %d | Time per bar: %.9f' % (indicator_class.__name__, period, t))
+
+
+
+##############################################
+# CONCLUSION:
+# calculate reads the whole lookback window on every bar, so its cost grows with the period.
+# Incremental indicator gets only the new bar and updates its running state, per-bar cost is constant.
@@ -0,0 +1,59 @@
+import os
+import sys
+from time import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_manager as dm
+from data_manager import ArrayFrame
+from indicator import SystemIndicator
+
+
+#################################
+print('# Benchmark indicator initialization: bar by bar (initialize) vs vectorized (compute_all)')
+
+N = 100000
+PERIOD = 20
+close = 1.13 + np.cumsum(np.random.normal(0, 0.0005, N))
+dm.data.data = ArrayFrame.from_dataframe(pd.DataFrame({'Date': pd.date_range('2000-01-01', periods=N, freq='min'),
+                                                       'Open': close, 'High': close, 'Low': close, 'Close': close}))
+
+class SmaLoop(SystemIndicator):
+    def initialize(self, data):
+        n = min(PERIOD, len(data))
+        return [sum(data[i].Close for i in range(n)) / n]
+
+class SmaVectorized(SmaLoop):
+    def compute_all(self, data):
+        output = np.full(len(data), np.nan)
+        cumsum = np.cumsum(data.Close)
+        output[PERIOD-1:] = (cumsum[PERIOD-1:] - np.concatenate([[0.0], cumsum[:-PERIOD]])) / PERIOD
+        return output
+
+init_idx = N - 1
+
+for warmup in [1000, 10000]:
+    print()
+    SmaLoop.WARMUP = warmup
+    indicator = SmaLoop('sma')
+    start = time()
+    indicator.init(init_idx)
+    t = time() - start
+    print('[initialize] Warmup: %d | Time: %f' % (warmup, t))
+
+    vectorized = SmaVectorized('sma')
+    start = time()
+    vectorized.init(init_idx)
+    t = time() - start
+    print('[compute_all] All %d bars | Time: %f' % (init_idx + 1, t))
+
+    print('Same output: %s' % np.allclose(indicator.output[init_idx-warmup+PERIOD:], vectorized.output[init_idx-warmup+PERIOD:]))
+
+
+
+##############################################
+# CONCLUSION:
+# Bar by bar initialization calls user code for every warmup bar, compute_all computes output of all bars
+# up to the initial frame in one NumPy pass - it is faster even though it covers the whole history.
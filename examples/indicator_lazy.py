@@ -0,0 +1,61 @@
+import os
+import sys
+from time import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backtest import RunConfig, setup_simulator
+
+
+#################################
+print('# Benchmark simulation loop with many overlay indicators: calculated on every frame vs lazy (calculated when read)')
+
+config = RunConfig.load('examples/backtest_config.json')
+config.start_time = '2018-09-01 00:00'
+config.stop_time = '2019-03-20 00:00'
+
+overlays = [('indicators/%s.py' % module, {'period': period})
+            for module in ['sma', 'ema', 'wma', 'rsi', 'atr'] for period in [10, 20, 50, 100]] + \
+           [('indicators/bollinger_bands.py', {'period': period}) for period in [20, 50]] + \
+           [('indicators/indicator_example1.py', {})]
+
+VIEW_BARS = 200 # plot shows last VIEW_BARS bars
+VIEW_EVERY = 25 # plot is redrawn every VIEW_EVERY frames (e.g. only when user looks at it)
+
+def run(lazy, view):
+    sim = setup_simulator(config)
+    sys.stdout = open(os.devnull, 'w') # silence handler messages
+    indicators = [sim.add_indicator('overlay%d' % i, module, parameters, lazy) for i, (module, parameters) in enumerate(overlays)]
+    sys.stdout = sys.__stdout__
+
+    frames = 0
+    start = time()
+    while not sim._is_last_frame():
+        sim._update_frame_data()
+        sim._update_handlers()
+        frames += 1
+        if view and frames % VIEW_EVERY == 0:
+            # only first three overlays are visible
+            for indicator in indicators[:3]:
+                indicator.get_data(sim.frame_data.time, VIEW_BARS)
+    t = time() - start
+    return t / frames, sim.indicator_handler.get_outputs()
+
+if __name__ == '__main__':
+    for view in [False, True]:
+        t_eager, eager = run(False, view)
+        t_lazy, lazy = run(True, view)
+        # get_outputs calculates all remaining bars of lazy indicators, so outputs can be compared
+        error = max(np.nanmax(np.abs(eager[key] - lazy[key])) for key in eager)
+        print('[%s] Time per frame | eager: %.6f | lazy: %.6f | Max difference of outputs: %.3e' % (
+              'plot of 3 overlays' if view else 'no plots', t_eager, t_lazy, error))
+
+
+
+##############################################
+# CONCLUSION:
+# Lazy indicators only remember the current frame on update, so overlays which are not read cost nothing per
+# frame. Bars are calculated when a trader or a plot reads them, and only once - the plot of the last bars
+# calculates just the bars added since the previous redraw. Outputs are the same as with calculation on every
+# frame (up to floating point rounding).
@@ -0,0 +1,135 @@
+import os
+import sys
+from time import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'indicators'))
+import data_manager as dm
+from data_manager import ArrayFrame, DataView
+from sma import SMA
+from ema import EMA
+from wma import WMA
+from rsi import RSI
+from atr import ATR
+from bollinger_bands import BollingerBands
+from macd import MACD
+from stochastic import Stochastic
+from rolling_min import RollingMin
+from rolling_max import RollingMax
+
+
+N = 20000
+np.random.seed(0)
+close = 1.13 + np.cumsum(np.random.normal(0, 0.0005, N))
+open_ = np.concatenate([[close[0]], close[:-1]])
+high = np.maximum(open_, close) + np.abs(np.random.normal(0, 0.0003, N))
+low = np.minimum(open_, close) - np.abs(np.random.normal(0, 0.0003, N))
+data = ArrayFrame.from_dataframe(pd.DataFrame({'Date': pd.date_range('2000-01-01', periods=N, freq='min'),
+                                               'Open': open_, 'High': high, 'Low': low, 'Close': close}))
+dm.data.data = data
+
+indicators = [
+    (SMA, {'period': 20, 'source': 'Close'}),
+    (EMA, {'period': 20, 'source': 'Close'}),
+    (WMA, {'period': 20, 'source': 'Close'}),
+    (RSI, {'period': 14, 'source': 'Close'}),
+    (ATR, {'period': 14}),
+    (BollingerBands, {'period': 20, 'deviations': 2.0, 'source': 'Close'}),
+    (MACD, {'fast': 12, 'slow': 26, 'signal': 9, 'source': 'Close'}),
+    (Stochastic, {'k_period': 14, 'd_period': 3}),
+    (RollingMin, {'period': 20, 'source': 'Low'}),
+    (RollingMax, {'period': 20, 'source': 'High'}),
+]
+
+def partial_bar(idx):
+    ''' In-progress candle of bar idx - close somewhere in the range of the completed bar '''
+    price = np.random.uniform(low[idx], high[idx])
+    return SimpleNamespace(Open=open_[idx], High=max(open_[idx], price), Low=min(open_[idx], price), Close=price)
+
+
+#################################
+print('# Agreement of vectorized (compute_all) and incremental (on_bar) paths')
+
+for indicator_class, parameters in indicators:
+    indicator = indicator_class('indicator', parameters)
+    vectorized = indicator.compute_all(data)
+    if isinstance(vectorized, tuple):
+        vectorized = np.column_stack(vectorized) # one column for every output
+    vectorized = np.asarray(vectorized, dtype=np.float64).reshape(N, -1)
+
+    # every bar is first passed as a few in-progress candles which are replaced, then as the completed bar
+    indicator.reset_state()
+    incremental = np.full((N, len(indicator.OUTPUTS)), np.nan)
+    for idx in range(N):
+        replace = False
+        for _ in range(np.random.randint(0, 3)):
+            indicator.on_bar(partial_bar(idx), replace)
+            replace = True
+        incremental[idx] = indicator.on_bar(data.row(idx), replace)
+
+    assert np.array_equal(np.isnan(vectorized), np.isnan(incremental))
+    valid = ~np.isnan(vectorized)
+    error = np.max(np.abs(vectorized[valid] - incremental[valid]))
+    assert error < 1e-8, error
+    print('[%s] %s | Outputs: %s | NaN values: %d | Max difference: %.3e' % (
+          indicator_class.__name__, parameters, indicator.OUTPUTS, valid.size - valid.sum(), error))
+
+
+#################################
+print()
+print('# Benchmark per-bar update: naive recomputation over lookback window vs incremental on_bar')
+
+init_idx = 1000
+bars = 5000
+LOOKBACK = 200
+
+for indicator_class, parameters in indicators:
+    indicator = indicator_class('indicator', parameters)
+
+    # naive - indicator is computed from scratch over last LOOKBACK bars on every bar
+    start = time()
+    for idx in range(init_idx + 1, init_idx + bars + 1):
+        indicator.reset_state()
+        for i in range(idx - LOOKBACK + 1, idx + 1):
+            value = indicator.on_bar(data.row(i), False)
+    t_naive = (time() - start) / bars
+
+    indicator.init(init_idx)
+    start = time()
+    for idx in range(init_idx + 1, init_idx + bars + 1):
+        indicator.update(DataView(dm.data, idx), idx)
+    t_incremental = (time() - start) / bars
+
+    print('[%s] Time per bar | naive: %.9f | incremental: %.9f' % (indicator_class.__name__, t_naive, t_incremental))
+
+
+#################################
+print()
+print('# Benchmark initialization over %d bars: bar by bar vs vectorized' % N)
+
+for indicator_class, parameters in indicators:
+    indicator = indicator_class('indicator', parameters)
+    start = time()
+    indicator.reset_state()
+    for idx in range(N):
+        indicator.on_bar(data.row(idx), False)
+    t_loop = time() - start
+
+    start = time()
+    indicator.compute_all(data)
+    t_vectorized = time() - start
+    print('[%s] bar by bar: %f | vectorized: %f' % (indicator_class.__name__, t_loop, t_vectorized))
+
+
+
+##############################################
+# CONCLUSION:
+# Both paths of every indicator give the same output (up to floating point rounding), also when the latest
+# bar is replaced by in-progress candles. Incremental update costs the same on every bar regardless of lookback,
+# while naive recomputation pays for the whole lookback window on every bar. Vectorized initialization
+# computes the whole history in a few NumPy/pandas passes instead of a Python call per bar.
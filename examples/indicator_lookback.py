@@ -0,0 +1,73 @@
+import os
+import sys
+from time import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_manager as dm
+from data_manager import ArrayFrame
+from indicator import SystemIndicator
+
+
+#################################
+print('# Benchmark indicator reading the last PERIOD bars: whole history + default warmup vs declared lookback')
+
+N = 20000
+PERIOD = 20
+close = 1.13 + np.cumsum(np.random.normal(0, 0.0005, N))
+dm.data.data = ArrayFrame.from_dataframe(pd.DataFrame({'Date': pd.date_range('2000-01-01', periods=N, freq='min'),
+                                                       'Open': close, 'High': close, 'Low': close, 'Close': close}))
+
+class SmaWholeHistory(SystemIndicator):
+    ''' Gets the whole history, reads only the last PERIOD bars of it '''
+    def initialize(self, data):
+        return self.calculate(data)
+
+    def calculate(self, data):
+        n = min(PERIOD, len(data))
+        return [sum(data[i].Close for i in range(n)) / n]
+
+class SmaLookback(SystemIndicator):
+    ''' Gets only the last PERIOD bars - mean of everything it is given '''
+    LOOKBACK = PERIOD
+
+    def initialize(self, data):
+        return self.calculate(data)
+
+    def calculate(self, data):
+        return [sum(bar.Close for bar in data) / len(data)]
+
+init_idx = N // 2
+
+outputs = {}
+for indicator_class in [SmaWholeHistory, SmaLookback]:
+    indicator = indicator_class('sma')
+    start = time()
+    indicator.init(init_idx)
+    t_init = time() - start
+
+    # the same as IndicatorHandler.update - input data is bounded to declared lookback
+    start = time()
+    for data_idx in range(init_idx+1, N):
+        input_data = dm.DataView(dm.data, data_idx).window(indicator.get_lookback())
+        indicator.update(input_data, data_idx)
+    t_update = time() - start
+
+    print('[%s] Warmup: %d bars | Init time: %f | Update time (%d frames): %f' %
+          (indicator_class.__name__, indicator.get_warmup(), t_init, N - init_idx - 1, t_update))
+    outputs[indicator_class] = indicator.output
+
+# outputs agree wherever both had a full window of warmup
+start = init_idx - PERIOD + 1
+print('Same output: %s' % np.allclose(outputs[SmaWholeHistory][start:], outputs[SmaLookback][start:]))
+
+
+
+##############################################
+# CONCLUSION:
+# Declared lookback shortens warmup from the default 1000 bars to PERIOD bars, so initialization of bar by bar
+# indicators is ~40x faster. Input data is a bounded view of the loaded arrays (nothing is copied per frame),
+# so update time is the same - but indicator code can simply use the whole input (len(data), iteration)
+# without reading past its window.
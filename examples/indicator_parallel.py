@@ -0,0 +1,105 @@
+import os
+import sys
+import tempfile
+from time import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_manager as dm
+from data_manager import ArrayFrame
+from indicator_handler import IndicatorHandler
+from utils import FrameData
+
+
+#################################
+print('# Benchmark per-frame update of many NumPy-heavy indicators: sequential vs thread pool per topological level')
+print('CPUs: %d' % os.cpu_count())
+
+N = 20000
+close = 1.13 + np.cumsum(np.random.normal(0, 0.0005, N))
+dm.data.data = ArrayFrame.from_dataframe(pd.DataFrame({'Date': pd.date_range('2000-01-01', periods=N, freq='min'),
+                                                       'Open': close, 'High': close, 'Low': close, 'Close': close}))
+
+# indicator spending its time in NumPy (BLAS releases GIL) - energy of lagged covariance matrix over last period bars
+INDICATOR_SOURCE = '''
+import numpy as np
+from indicator import SystemIndicator
+
+dependencies = {}
+parameters = {'period': 4000, 'lags': 32}
+
+class LagCovariance(SystemIndicator):
+    WARMUP = 0
+    def calculate(self, data):
+        window = self.data.Close[max(0, self.data_idx-self.period+1):self.data_idx+1]
+        lagged = np.lib.stride_tricks.sliding_window_view(window - window.mean(), self.lags)
+        return [np.trace(lagged.T @ lagged) / len(lagged)]
+'''
+
+# level 1 indicator depending on two indicators of level 0
+SPREAD_SOURCE = '''
+from indicator import SystemIndicator
+
+dependencies = {{
+    'fast': {{'indicator': '{module}', 'parameters': {{'period': 1000}}}},
+    'slow': {{'indicator': '{module}', 'parameters': {{'period': 4000}}}},
+}}
+parameters = {{}}
+
+class Spread(SystemIndicator):
+    WARMUP = 0
+    def calculate(self, data):
+        return [self.fast.output[self.data_idx, 0] - self.slow.output[self.data_idx, 0]]
+'''
+
+INDICATORS = 32
+init_idx = 5000
+frames = 300
+
+def run(module, spread_module, max_workers):
+    handler = IndicatorHandler()
+    handler.max_workers = max_workers
+    handler.set_init_frame(init_idx)
+    for i in range(INDICATORS):
+        handler.add_indicator('lag_cov%d' % i, module, {'period': 1000 + 100 * i})
+    handler.add_indicator('spread', spread_module, {})
+
+    frame_data = FrameData()
+    start = time()
+    for idx in range(init_idx + 1, init_idx + frames + 1):
+        frame_data.core_data_idx = idx
+        handler.update(frame_data)
+    t = (time() - start) / frames
+    handler.close()
+    return t, [np.array(indicator.output) for indicator in handler.indicators.values()]
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as directory:
+        module = os.path.join(directory, 'lag_covariance.py')
+        spread_module = os.path.join(directory, 'spread.py')
+        with open(module, 'w') as f:
+            f.write(INDICATOR_SOURCE)
+        with open(spread_module, 'w') as f:
+            f.write(SPREAD_SOURCE.format(module=module))
+
+        sys.stdout = open(os.devnull, 'w') # silence handler messages
+        results = {workers: run(module, spread_module, workers) for workers in [0, 2, 4, 8]}
+        sys.stdout = sys.__stdout__
+
+    for workers, (t, outputs) in results.items():
+        same = all(np.array_equal(a, b, equal_nan=True) for a, b in zip(outputs, results[0][1]))
+        print('[%s] Time per frame: %.6f | Same outputs as sequential: %s' % (
+              'sequential' if workers == 0 else 'workers=%d' % workers, t, same))
+
+
+
+##############################################
+# CONCLUSION:
+# Indicators of the same topological level do not depend on each other, so they can be updated on a thread
+# pool while the levels are still updated in order. Every indicator writes only its own output, so outputs are
+# identical to sequential update. Threads pay off only when indicators spend their time in NumPy code which
+# releases GIL (e.g. BLAS matrix products) and there are several CPU cores - pure Python indicators and
+# single-core machines only pay the thread pool overhead (a few tens of microseconds per level). Multithreaded
+# BLAS competes with the pool for the same cores, limiting it (e.g. OPENBLAS_NUM_THREADS=1) usually helps.
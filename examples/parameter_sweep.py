@@ -0,0 +1,25 @@
+import os
+import sys
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backtest import RunConfig
+from optimization import sweep
+
+
+#################################
+print('# Benchmark parameter sweep scaling with number of worker processes')
+
+config = RunConfig.load('examples/backtest_config.json')
+config.stop_time = '2019-02-03 00:00'
+grid = {'param1': list(range(32))}
+
+if __name__ == '__main__':
+    for max_workers in [1, 2, 4, os.cpu_count()]:
+        start = time()
+        results = list(sweep('traders/trader_example1.py', grid, config, max_workers))
+        t = time() - start
+        print('Workers: %d | Runs: %d | Time: %f | Runs per second: %f' % (max_workers, len(results), t, len(results) / t))
+
+    best = max(results, key=lambda result: result[1]['final_balance'])
+    print('Best parameters: %s (%s)' % best)
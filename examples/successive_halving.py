@@ -0,0 +1,42 @@
+import os
+import sys
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backtest import RunConfig, ModuleConfig, run_backtest, get_metrics
+from optimization import sweep, successive_halving, get_sweep_config
+
+
+#################################
+print('# Benchmark parameter search: full grid vs successive halving')
+
+config = RunConfig.load('examples/backtest_config.json')
+config.start_time = '2018-09-01 00:00'
+config.stop_time = '2019-03-20 00:00'
+grid = {'param1': list(range(32))}
+trader = 'traders/trader_example1.py'
+
+if __name__ == '__main__':
+    start = time()
+    results = list(sweep(trader, grid, config, share_data=True))
+    print('[grid] Runs: %d | Time: %f' % (len(results), time() - start))
+
+    start = time()
+    results = successive_halving(trader, grid, config, eta=2, min_fraction=1/16)
+    print('[halving] Time: %f | Best: %s' % (time() - start, results[0]))
+
+    # checkpointed state includes indicators on higher timeframe - survivors continue with the same result as full run
+    config.indicators.append(ModuleConfig('sma_daily', 'indicators/sma.py', {'period': 5, 'timeframe': 'D'}))
+    results = successive_halving(trader, grid, config, eta=2, min_fraction=1/16)
+    best_parameters, best_metrics = results[0]
+    full_run = get_metrics(run_backtest(get_sweep_config(config, trader, best_parameters)))
+    print('[halving with daily indicator] Best: %s | Same as full run: %s' % (results[0], full_run == best_metrics))
+
+
+
+##############################################
+# CONCLUSION:
+# Full grid simulates every candidate over the whole window. Halving simulates all candidates only on
+# the first 1/16 of the window and with eta=2 only half of them continue to every next rung - survivors
+# continue from checkpointed state, so already simulated bars are not simulated again.
+# Continuing from checkpoint gives the same metrics as simulating the whole window (also with higher timeframe indicators).
@@ -0,0 +1,47 @@
+import os
+import sys
+from time import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backtest import RunConfig, run_backtest, get_metrics
+from optimization import sweep, walk_forward, get_walk_forward_windows, get_window_config, get_sweep_config
+
+
+#################################
+print('# Benchmark walk-forward optimization: independent runs per window vs shared data and indicator outputs')
+
+config = RunConfig.load('examples/backtest_config.json')
+config.start_time = '2018-09-01 00:00'
+config.stop_time = '2019-03-20 00:00'
+grid = {'param1': list(range(8))}
+trader = 'traders/trader_example1.py'
+IN_SAMPLE, OUT_OF_SAMPLE = '60D', '30D'
+
+if __name__ == '__main__':
+    windows = get_walk_forward_windows(config.start_time, config.stop_time, IN_SAMPLE, OUT_OF_SAMPLE)
+    print('Windows: %d | Runs per window: %d' % (len(windows), len(grid['param1']) + 1))
+
+    # every window optimized separately, every run loads data and computes indicators itself
+    start = time()
+    for in_sample_start, out_of_sample_start, out_of_sample_stop in windows:
+        results = list(sweep(trader, grid, get_window_config(config, in_sample_start, out_of_sample_start)))
+        best = max(results, key=lambda result: result[1]['final_balance'])[0]
+        run_backtest(get_sweep_config(get_window_config(config, out_of_sample_start, out_of_sample_stop), trader, best))
+    print('[independent] Time: %f' % (time() - start))
+
+    start = time()
+    result = walk_forward(trader, grid, config, IN_SAMPLE, OUT_OF_SAMPLE)
+    print('[walk_forward] Time: %f' % (time() - start))
+
+    for window in result.windows:
+        print('%s - %s - %s | %s | out-of-sample profit: %f' % (window.in_sample_start, window.out_of_sample_start,
+              window.out_of_sample_stop, window.parameters, window.out_of_sample_metrics['profit']))
+    print('Stitched out-of-sample: %s' % get_metrics(result))
+
+
+
+##############################################
+# CONCLUSION:
+# walk_forward loads data once, computes indicators once over the whole date range and keeps the process
+# pool busy with in-sample runs of all windows at once, so it does not pay data loading, indicator warmup
+# and pool start-up for every window.
@@ -1,11 +1,12 @@
 from typing import Dict, List
 from numbers import Number
+import threading
 import numpy as np
 import pandas as pd
 import time as t
 
 import data_manager as dm
-from visualizations import DataSourceInteraface, VisualizationParams
+from visualization_interface import DataSourceInteraface, VisualizationParams
 from utils import *
 
 class CommonParams:
@@ -13,11 +14,54 @@ class CommonParams:
     PERSIST = True
     visualization = [VisualizationParams()]
 
+    def __init__(self):
+        # every indicator has its own list (one entry per output line), updated from parameters
+        self.visualization = [VisualizationParams()]
+
+
+class OutputLine:
+    ''' Named output of multi-output indicator - line[i] is its value i bars before current frame (like indicator[i]) '''
+    def __init__(self, indicator, column):
+        self.indicator = indicator
+        self.column = column
+
+    def __getitem__(self, item):
+        row = self.indicator[item]
+        return None if row is None else row[self.column]
+
 
 class SystemIndicator(DataSourceInteraface):
     ''' System indicator is a wrapper around User indicator which provides all neccessary 
         methods for indicator to be integrated in simulation '''
 
+    ''' Number of bars before initial frame used to initialize indicator (if lookback is not declared) '''
+    WARMUP = 1000
+
+    '''
+    Number of bars indicator reads - data[0] to data[LOOKBACK-1], None means the whole history. Indicator with
+    declared lookback gets input data bounded to the last LOOKBACK bars and is warmed up with LOOKBACK bars.
+    Parameter 'lookback' overrides it, indicators with a window parameter (period) override get_lookback.
+    '''
+    LOOKBACK = None
+
+    '''
+    Higher timeframe of indicator (pandas frequency, e.g. '4h' or 'D' over hourly data), None means timeframe of core
+    data. Parameter 'timeframe' (accepted by every indicator) overrides it. Indicator then works with bars resampled
+    from core data (see data_manager.Timeframe) - data_idx and indicator[i] refer to its own bars and the bar of the
+    current frame is in-progress candle built from base bars up to the current one. Dependencies use the same timeframe.
+    '''
+    TIMEFRAME = None
+
+    '''
+    Names of outputs - output is (N, K) array with a column for every output. Indicator with several outputs returns
+    a row of K values for a bar (compute_all returns (N, K) array or tuple of K arrays), traders read a single output
+    by name - indicator['upper'][0], plots draw a line for every output.
+    '''
+    OUTPUTS = ['value']
+
+    ''' Lazy evaluation can be triggered by GUI thread (plots), it must not interleave with frame update '''
+    lazy_lock = threading.RLock()
+
     def __init__(self, name="indicator", parameters: Dict = {}):
         
         self.parameters = CommonParams()
@@ -28,11 +72,30 @@ class SystemIndicator(DataSourceInteraface):
         self.output = []
         self.last_output_size = 0
         self.depending_indicators = None
+        self.precomputed = False
+        self.cached_idx = -1 # output of bars up to cached_idx was loaded from indicator cache, it is not calculated again
+        # incremental indicators (on_bar is defined) keep internal state, state_idx is the last bar passed to on_bar
+        self.incremental = type(self).on_bar is not SystemIndicator.on_bar
+        self.state_idx = -1
+        self.state_partial = False # last bar passed to on_bar was in-progress candle
+        # lazy indicator is not calculated on update, output of a bar is calculated when it is read (see set_lazy)
+        self.lazy = False
+        self.computed = None # bars with calculated output (lazy mode)
+        self.frame_input = None # input data of the current frame (lazy mode)
+        self.frame_idx = -1
+        self.timeframe_data = None # resampled data of higher timeframe (data_manager.Timeframe)
 
     def __getitem__(self, item):
-        if type(item) != int:
-            print("[{}][SytemIndicator] Unsupported subscript type: {} (only integer is allowed).".format(self.name, type(item)))
+        if type(item) == str:
+            if item not in self.OUTPUTS:
+                print("[{}][SytemIndicator] Unknown output: '{}' (outputs: {}).".format(self.name, item, self.OUTPUTS))
+                return None
+            return OutputLine(self, self.OUTPUTS.index(item))
+        elif type(item) != int:
+            print("[{}][SytemIndicator] Unsupported subscript type: {} (only integer or output name is allowed).".format(self.name, type(item)))
         else:
+            if self.lazy:
+                self.evaluate(self.data_idx - item, self.data_idx - item)
             return self.output[self.data_idx - item]
 
     def set_user_parameters(self, parameters: Dict):
@@ -42,64 +105,239 @@ class SystemIndicator(DataSourceInteraface):
             setattr(self, name, value)
 
     # TODO: Obsidian
-    def set_depending_indicators(self, indicators: List):
+    def set_depending_indicators(self, indicators: Dict):
+        ''' Indicators keyed by dependency name - shared indicator can have different name in every dependent '''
         self.depending_indicators = indicators
-        for indicator in self.depending_indicators:
+        for name, indicator in self.depending_indicators.items():
             # TODO: check if indicator name already exists
-            setattr(self, indicator.name, indicator)
+            setattr(self, name, indicator)
 
+    def get_lookback(self):
+        return getattr(self, 'lookback', self.LOOKBACK)
 
-    def init(self, init_idx, n=1000):
-        self.output = np.zeros((self.data.shape[0], 1))
-        self.output[:] = np.nan
-        
-        init_start_idx = max(1, init_idx-n)
-        for index in range(init_start_idx, init_idx+1):
-            input_data = self.data[0:index+1]
-            # reverse order - first in list is latest data
-            input_data.reverse()
-            output = self.initialize(input_data)
-            for i in range(len(output)):
-                self.output[index-i] = output[i]
+    def get_warmup(self):
+        lookback = self.get_lookback()
+        return self.WARMUP if lookback is None else lookback
+
+    def get_timeframe(self):
+        return getattr(self, 'timeframe', None) or self.TIMEFRAME
+
+    def set_timeframe(self, timeframe_data):
+        ''' Work with bars of higher timeframe (data_manager.Timeframe) - must be set before init '''
+        self.timeframe_data = timeframe_data
+        self.data = timeframe_data.data
+
+    def get_input_data(self, data_idx, current_candle=None):
+        ''' Input data of bar data_idx - bounded to lookback (if it is declared) '''
+        return dm.DataView(self.data, data_idx, current_candle).window(self.get_lookback())
+
+    def init(self, init_idx, n=None):
+        if n is None:
+            n = self.get_warmup()
+        # output is calculated (indicator may be initialized again - e.g. after data was reloaded)
+        self.precomputed = False
+        self.cached_idx = -1
+        # one preallocated buffer for all outputs, rows are written in place
+        self.output = np.full((self.data.shape[0], len(self.OUTPUTS)), np.nan)
+
+        # vectorized initialization (if indicator provides it) - output of all bars up to init_idx in one pass
+        # (there are no bars to initialize if init_idx < 0, e.g. initial frame is in the first higher timeframe bar)
+        output = self.compute_all(self.data.to_array_frame(0, init_idx+1)) if init_idx >= 0 else None
+        if output is not None:
+            if isinstance(output, tuple):
+                output = np.column_stack(output)
+            self.output[:init_idx+1] = np.asarray(output, dtype=np.float64).reshape(init_idx+1, -1)
+
+        if self.incremental:
+            # state of incremental indicator is built from warmup bars (output of vectorized initialization is kept)
+            self.replay(max(0, init_idx-n), init_idx, set_output=output is None)
+        elif output is None:
+            init_start_idx = max(1, init_idx-n)
+            for index in range(init_start_idx, init_idx+1):
+                # reverse order - first in list is latest data
+                input_data = self.get_input_data(index)
+                output = self.initialize(input_data)
+                for i in range(len(output)):
+                    self.output[index-i] = output[i]
 
         self.data_idx = init_idx
 
+    def replay(self, start_idx, stop_idx, set_output=True):
+        ''' Reset state of incremental indicator and pass it (completed) bars [start_idx, stop_idx] one by one '''
+        self.reset_state()
+        for index in range(start_idx, stop_idx+1):
+            output = self.on_bar(self.data[index], False)
+            if set_output:
+                self._set_output(index, output)
+        self.state_idx = stop_idx
+        self.state_partial = False
+
+    def set_precomputed_output(self, output, init_idx):
+        ''' Use output computed beforehand over all data (e.g. by other process), calculation is skipped on update '''
+        self.output = output
+        self.data_idx = init_idx
+        self.precomputed = True
+
+    def set_cached_output(self, output, rows, init_idx):
+        ''' Use output stored by earlier run (see IndicatorCache), only bars after the first rows bars are calculated '''
+        if rows >= self.data.shape[0]:
+            # output of all bars is stored - stored (memory mapped) array is used as it is
+            self.set_precomputed_output(output, init_idx)
+            return
+        self.output = np.full((self.data.shape[0], output.shape[1]), np.nan)
+        self.output[:rows] = output[:rows]
+        self.precomputed = False
+        self.cached_idx = rows - 1
+        self.data_idx = init_idx
+
+    def set_lazy(self, lazy=True):
+        '''
+        In lazy mode output of a bar is calculated only when it is read - by indicator[i] or get_data (e.g. plot of
+        visible range), calculated bars are remembered. Indicators nobody reads then cost nothing per frame.
+        Only indicators which persist their output can be lazy. Must be set before the simulation starts.
+        '''
+        self.lazy = lazy and self.parameters.PERSIST
+        if self.lazy:
+            self.computed = np.zeros(self.data.shape[0], dtype=bool)
+            # output of initial frame and bars before it is calculated by init
+            self.computed[:self.data_idx+1] = True
+
+    def evaluate(self, start_idx, stop_idx):
+        ''' Lazy mode - calculate output of bars [start_idx, stop_idx] (up to current frame) which is not calculated yet '''
+        if not self.lazy or self.frame_input is None:
+            return
+        with SystemIndicator.lazy_lock:
+            data_idx = self.data_idx
+            for idx in range(max(0, start_idx), min(stop_idx, data_idx) + 1):
+                if self.computed[idx]:
+                    continue
+                if self.incremental and idx == self.state_idx + 1 and self.state_partial:
+                    # in-progress candle of previous bar is replaced by the completed bar first (see _update_state)
+                    self.computed[self.state_idx] = True
+                # bar is calculated as if it was the current frame (also from point of view of dependencies)
+                input_data = self.frame_input if idx == self.frame_idx else self.get_input_data(idx)
+                dependencies = list(self.depending_indicators.values()) if self.depending_indicators else []
+                dependencies_idx = [dependency.data_idx for dependency in dependencies]
+                for dependency in dependencies:
+                    dependency.data_idx = idx
+                try:
+                    self._update(input_data, idx)
+                finally:
+                    for dependency, dependency_idx in zip(dependencies, dependencies_idx):
+                        dependency.data_idx = dependency_idx
+                    self.data_idx = data_idx
+                self.computed[idx] = True
+
     def reset_last_output(self, idx):
         for i in range(idx, idx-self.last_output_size, -1):
             self.output[i] = np.nan
 
     def update(self, input_data, data_idx):
+        if self.lazy:
+            # only current frame is remembered - bar of previous frame may have been calculated from in-progress candle
+            if self.frame_input is not None and self.frame_input.current_candle is not None:
+                self.computed[self.frame_idx] = False
+            self.data_idx = self.frame_idx = data_idx
+            self.frame_input = input_data
+            self.computed[data_idx] = data_idx <= self.cached_idx or self.precomputed
+            return
+
+        self._update(input_data, data_idx)
+
+    def _update(self, input_data, data_idx):
         self.data_idx = data_idx
+        if self.precomputed or data_idx <= self.cached_idx:
+            return
 
         if not self.parameters.PERSIST:
             self.reset_last_output(self.data_idx)
-        
-        output = self.calculate(input_data)
+
+        if self.incremental:
+            output = self._update_state(input_data[0], self.data_idx, input_data.current_candle is not None)
+            self.last_output_size = self._set_output(self.data_idx, output)
+        else:
+            self.last_output_size = self._set_output(self.data_idx, self.calculate(input_data))
+
+    def _update_state(self, bar, data_idx, partial):
+        ''' Pass latest bar to incremental indicator - bar which was already passed (in-progress candle) is replaced '''
+        if data_idx == self.state_idx:
+            self.state_partial = partial
+            return self.on_bar(bar, True)
+        if data_idx != self.state_idx + 1:
+            # simulation has stepped backward or jumped - state is rebuilt from preceding bars (their output is kept)
+            self.replay(max(0, data_idx-self.get_warmup()), data_idx-1, set_output=False)
+        elif self.state_partial:
+            # previous bar has been completed - its last in-progress candle is replaced by the completed bar
+            self._set_output(self.state_idx, self.on_bar(self.data[self.state_idx], True))
+        self.state_idx = data_idx
+        self.state_partial = partial
+        return self.on_bar(bar, False)
+
+    def _set_output(self, idx, output):
+        '''
+        Output is a list (index 0 is output of bar idx, index i of bar idx-i), single value or None (no output).
+        With several outputs, output of a bar is a row of values (list of rows for several bars).
+        '''
+        if output is None:
+            return 0
+        if isinstance(output, Number):
+            output = [output]
+        elif self.output.shape[1] > 1 and len(output) > 0 and isinstance(output[0], Number):
+            output = [output]
         for i in range(len(output)):
-            self.output[self.data_idx-i] = output[i]
-        
-        self.last_output_size = len(output)
+            self.output[idx-i] = output[i]
+        return len(output)
 
 
     def get_data(self, time, n=1): # -> np.ndarray:
-        ''' Overloaded interface function for getting indicator ouput data '''
-        last_time = self.data.Date[self.data_idx]
-        step = 0
-        if last_time < time: step = 1
-        elif last_time > time: step = -1
-        data_idx = self.data_idx + step
-
-        while (step > 0 and self.data.Date[data_idx] <= time) or \
-              (step < 0 and self.data.Date[data_idx] >= time):
-            data_idx += step
-        data_idx -= step
+        ''' Overloaded interface function for getting indicator ouput data - (n, K) array, column for every output '''
+        if self.timeframe_data is None:
+            data_idx = self.data.get_idx_from_time_and_hint(time, self.data_idx)
+        else:
+            data_idx = self.timeframe_data.base.get_idx_from_time_and_hint(time, self.timeframe_data.bar_last[self.data_idx])
+        return self.get_aligned_output(data_idx-n+1, data_idx)
 
-        return self.output[data_idx-n+1 : data_idx+1]
+    def get_aligned_output(self, start_idx, stop_idx):
+        '''
+        Output of bars [start_idx, stop_idx] of core data. Indicator on higher timeframe gives every base bar output of
+        the last higher timeframe bar completed by it (NaN if there is none), so there is no look-ahead.
+        '''
+        if self.timeframe_data is None:
+            if self.lazy:
+                self.evaluate(start_idx, stop_idx)
+            return self.output[start_idx : stop_idx+1]
+        idx = self.timeframe_data.completed_bar[max(0, start_idx) : stop_idx+1]
+        if self.lazy and len(idx) > 0:
+            self.evaluate(idx[0], idx[-1])
+        output = np.asarray(self.output)[np.maximum(idx, 0)]
+        output[idx < 0] = np.nan
+        return output
 
 
-    # User functions - initialize is not obligatory function, if it is not defined default will be used
+    # User functions - initialize and compute_all are not obligatory functions, if they are not defined default will be used
+    # Incremental indicators define on_bar and reset_state instead of calculate and initialize
     def initialize(self, data) -> List[Number]:
         return []
+
+    def on_bar(self, bar, replace: bool):
+        '''
+        Incremental update - bar is the latest bar only (bar.Close, ...), so the cost does not depend on history length.
+        If replace is set, bar replaces previously passed bar (in-progress candle in tick mode has been updated),
+        so its previous contribution to the state has to be undone. Returns output of the bar.
+        '''
+        pass
+
+    def reset_state(self):
+        ''' Reset internal state of incremental indicator - called before bars are passed to on_bar from the start '''
+        pass
+
+    def compute_all(self, data) -> np.ndarray:
+        '''
+        Vectorized initialization - data is ArrayFrame of all bars up to initial frame in chronological order
+        (index 0 is the oldest bar, e.g. data.Close is NumPy array), returns output of every bar (NaN if there is none).
+        If it returns None (default), indicator is initialized bar by bar with initialize.
+        '''
+        return None
     
     def calculate(self, data) -> List[Number]:
         print("[{}][SystemIndicator] Calculate function not provided, cannot proceed." % self.name)
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+from typing import Dict
+from uuid import uuid4
+
+import numpy as np
+
+from utils import get_core_hash, get_module_hash
+
+'''
+On-disk store of indicator outputs, so indicators are not recomputed from scratch on every run.
+Entry is keyed by everything the output depends on:
+ - source of indicator module (including modules it depends on) and of indicator base modules
+ - resolved parameters of indicator (defaults of module updated with given parameters)
+ - data file and its range - time of the first loaded bar and of the initial frame (output before it comes from initialization)
+Output is stored as .npy file (can be memory mapped) together with a small manifest holding number of computed
+bars and hash of those bars of data. Entry is valid as long as the data has the same bars, so when the data file
+grows at the end, the stored output is reused and only the new bars are computed (entry is then extended).
+Only outputs of bar mode simulation are stored - in tick mode output of a bar is updated during the bar.
+'''
+class IndicatorCache:
+    VERSION = 1
+    ''' Modules defining how indicator output is computed - their source is part of every key '''
+    CORE_MODULES = ['indicator', 'indicator_functions', 'data_manager']
+
+    def __init__(self, cache_dir='.indicator_cache'):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._core_hash = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_key(self, module: str, parameters: Dict, data, init_idx: int) -> str:
+        ''' Key of output of indicator module with given parameters over loaded data (DataManager) initialized at init_idx '''
+        source_hash, parameters = get_module_hash(module, parameters)
+        h = hashlib.blake2b(digest_size=20)
+        h.update(str(IndicatorCache.VERSION).encode())
+        h.update(self._get_core_hash().encode())
+        h.update(json.dumps({
+            'source': source_hash,
+            'parameters': parameters,
+            'data_file': os.path.realpath(data.data_file),
+            'start': int(data.time_index[0]),
+            'init': int(data.time_index[init_idx])
+        }, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def load(self, key: str, data, mmap_mode='r'):
+        '''
+        Returns (output, rows) - stored output (memory mapped by default) of which the first rows bars are computed,
+        or None if there is no entry or the data differs from the data the output was computed from
+        '''
+        manifest = self._read_manifest(key)
+        try:
+            if manifest is None or manifest['version'] != IndicatorCache.VERSION or \
+               manifest['rows'] > data.shape[0] or manifest['data_hash'] != IndicatorCache.data_hash(data, manifest['rows']):
+                raise ValueError()
+            output = np.load(os.path.join(self.cache_dir, manifest['file']), mmap_mode=mmap_mode)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return output, manifest['rows']
+
+    def store(self, key: str, data, output: np.ndarray, rows: int) -> None:
+        ''' Store output of which the first rows bars are computed (only those are stored) '''
+        file = '{}.{}.npy'.format(key, uuid4().hex)
+        np.save(os.path.join(self.cache_dir, file), np.ascontiguousarray(output[:rows]))
+
+        # manifest is replaced atomically, output file of replaced entry is removed afterwards
+        old_manifest = self._read_manifest(key)
+        manifest = {'version': IndicatorCache.VERSION, 'file': file, 'rows': rows,
+                    'data_hash': IndicatorCache.data_hash(data, rows)}
+        manifest_file = self._get_manifest_file(key)
+        tmp_file = '{}.{}.tmp'.format(manifest_file, os.getpid())
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_file, manifest_file)
+        if old_manifest is not None:
+            try:
+                os.remove(os.path.join(self.cache_dir, old_manifest['file']))
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(('.npy', '.json')):
+                os.remove(entry.path)
+
+    @staticmethod
+    def data_hash(data, rows: int) -> str:
+        ''' Hash of the first rows bars of loaded data (all columns) '''
+        h = hashlib.blake2b(digest_size=20)
+        frame = data.to_array_frame(0, rows)
+        for name in frame.columns:
+            h.update(name.encode())
+            h.update(np.ascontiguousarray(frame[name]))
+        return h.hexdigest()
+
+    def _get_manifest_file(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def _read_manifest(self, key):
+        try:
+            with open(self._get_manifest_file(key), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _get_core_hash(self):
+        if self._core_hash is None:
+            self._core_hash = get_core_hash(IndicatorCache.CORE_MODULES)
+        return self._core_hash
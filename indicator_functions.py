@@ -0,0 +1,262 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+'''
+Common indicator computations used by the indicator library (indicators/ directory), every indicator has two paths:
+ - vectorized functions - output of the whole series in one pass (used by SystemIndicator.compute_all)
+ - incremental states - O(1) update with a single new value (used by SystemIndicator.on_bar), update with
+   replace=True replaces the last value (in-progress candle in tick mode) instead of adding a new one
+Outputs are NaN until there are enough values (e.g. the first period-1 values of SMA).
+'''
+
+##### Vectorized functions
+
+def _as_array(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+def sma(x, period: int) -> np.ndarray:
+    return pd.Series(_as_array(x)).rolling(period).mean().to_numpy()
+
+def ema(x, period: int, min_periods=None) -> np.ndarray:
+    ''' Exponential moving average (alpha = 2 / (period + 1)) seeded with the first value, NaN for the first period-1 values '''
+    min_periods = period if min_periods is None else min_periods
+    return pd.Series(_as_array(x)).ewm(span=period, adjust=False, min_periods=min_periods).mean().to_numpy()
+
+def wma(x, period: int) -> np.ndarray:
+    ''' Linearly weighted moving average - the latest value has weight period, the oldest value weight 1 '''
+    x = _as_array(x)
+    output = np.full(len(x), np.nan)
+    if len(x) >= period:
+        weights = np.arange(1, period + 1, dtype=np.float64)
+        output[period-1:] = np.lib.stride_tricks.sliding_window_view(x, period) @ weights / weights.sum()
+    return output
+
+def wilder(x, period: int) -> np.ndarray:
+    ''' Wilder's smoothing - seeded with the mean of the first period values, then avg += (x - avg) / period '''
+    x = _as_array(x)
+    output = np.full(len(x), np.nan)
+    if len(x) >= period:
+        seeded = np.concatenate([[x[:period].mean()], x[period:]])
+        output[period-1:] = pd.Series(seeded).ewm(alpha=1.0/period, adjust=False).mean().to_numpy()
+    return output
+
+def rolling_min(x, period: int) -> np.ndarray:
+    return pd.Series(_as_array(x)).rolling(period).min().to_numpy()
+
+def rolling_max(x, period: int) -> np.ndarray:
+    return pd.Series(_as_array(x)).rolling(period).max().to_numpy()
+
+def rolling_std(x, period: int) -> np.ndarray:
+    ''' Population standard deviation of the last period values '''
+    return pd.Series(_as_array(x)).rolling(period).std(ddof=0).to_numpy()
+
+def rsi(close, period: int) -> np.ndarray:
+    ''' Relative strength index (Wilder), 100 * avg gain / (avg gain + avg loss), 50 if there is no change '''
+    change = np.diff(_as_array(close))
+    gain = wilder(np.maximum(change, 0.0), period)
+    loss = wilder(np.maximum(-change, 0.0), period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        output = np.where(gain + loss > 0, 100.0 * gain / (gain + loss), 50.0)
+    output[np.isnan(gain)] = np.nan
+    return np.concatenate([[np.nan], output])
+
+def true_range(high, low, close) -> np.ndarray:
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+def atr(high, low, close, period: int) -> np.ndarray:
+    ''' Average true range (Wilder's smoothing of true range) '''
+    return wilder(true_range(high, low, close), period)
+
+def bollinger_bands(x, period: int, deviations: float):
+    ''' Returns (middle, upper, lower) - SMA and SMA +/- deviations * population standard deviation '''
+    middle = sma(x, period)
+    std = rolling_std(x, period)
+    return middle, middle + deviations * std, middle - deviations * std
+
+def macd(x, fast: int, slow: int, signal: int):
+    ''' Returns (macd, signal, histogram) - macd is EMA(fast) - EMA(slow), signal is EMA(signal) of macd '''
+    macd_line = ema(x, fast, 1) - ema(x, slow, 1)
+    macd_line[:slow-1] = np.nan
+    signal_line = pd.Series(macd_line).ewm(span=signal, adjust=False, min_periods=signal).mean().to_numpy()
+    return macd_line, signal_line, macd_line - signal_line
+
+def stochastic(high, low, close, k_period: int, d_period: int):
+    ''' Returns (%K, %D) - %K is position of close in [lowest low, highest high] of k_period bars, %D is SMA of %K '''
+    highest = rolling_max(high, k_period)
+    lowest = rolling_min(low, k_period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        k = np.where(highest > lowest, 100.0 * (_as_array(close) - lowest) / (highest - lowest), 50.0)
+    k[np.isnan(highest)] = np.nan
+    d = np.full(len(k), np.nan)
+    d[k_period-1:] = sma(k[k_period-1:], d_period)
+    return k, d
+
+
+##### Incremental states
+
+class RollingWindow:
+    ''' Last period values and their sum (simple moving average) '''
+    def __init__(self, period: int):
+        self.period = period
+        self.values = deque()
+        self.total = 0.0
+        self._undo = None
+
+    @property
+    def full(self):
+        return len(self.values) == self.period
+
+    def update(self, x, replace=False):
+        if replace:
+            self.total, removed = self._undo
+            self.values.pop()
+            if removed is not None:
+                self.values.appendleft(removed)
+        removed = self.values.popleft() if self.full else None
+        self._undo = (self.total, removed)
+        self.total += x - (0.0 if removed is None else removed)
+        self.values.append(x)
+        return self.mean
+
+    @property
+    def mean(self):
+        return self.total / self.period if self.full else np.nan
+
+class EmaState:
+    ''' Exponential moving average seeded with the first value '''
+    def __init__(self, period: int = None, alpha: float = None, min_periods: int = None):
+        self.alpha = 2.0 / (period + 1) if alpha is None else alpha
+        self.min_periods = (period or 1) if min_periods is None else min_periods
+        self.value = np.nan
+        self.count = 0
+        self._undo = None
+
+    def update(self, x, replace=False):
+        if replace:
+            self.value, self.count = self._undo
+        self._undo = (self.value, self.count)
+        self.value = x if self.count == 0 else self.value + self.alpha * (x - self.value)
+        self.count += 1
+        return self.value if self.count >= self.min_periods else np.nan
+
+class WilderState:
+    ''' Wilder's smoothing seeded with the mean of the first period values '''
+    def __init__(self, period: int):
+        self.period = period
+        self.value = np.nan
+        self.total = 0.0
+        self.count = 0
+        self._undo = None
+
+    def update(self, x, replace=False):
+        if replace:
+            self.value, self.total, self.count = self._undo
+        self._undo = (self.value, self.total, self.count)
+        self.count += 1
+        if self.count < self.period:
+            self.total += x
+        elif self.count == self.period:
+            self.value = (self.total + x) / self.period
+        else:
+            self.value += (x - self.value) / self.period
+        return self.value
+
+class WmaState:
+    ''' Linearly weighted moving average - weighted sum is updated from the plain sum in O(1) '''
+    def __init__(self, period: int):
+        self.period = period
+        self.values = deque()
+        self.total = 0.0
+        self.weighted = 0.0
+        self._undo = None
+
+    def update(self, x, replace=False):
+        if replace:
+            self.total, self.weighted, removed = self._undo
+            self.values.pop()
+            if removed is not None:
+                self.values.appendleft(removed)
+        removed = self.values.popleft() if len(self.values) == self.period else None
+        self._undo = (self.total, self.weighted, removed)
+        if removed is None:
+            # weights of values in the window are 1..n, new value gets weight n+1
+            self.weighted += (len(self.values) + 1) * x
+            self.total += x
+        else:
+            # the oldest value (weight 1) leaves, weights of the others decrease by 1, new value gets weight period
+            self.weighted += self.period * x - self.total
+            self.total += x - removed
+        self.values.append(x)
+        return self.weighted / (self.period * (self.period + 1) / 2) if len(self.values) == self.period else np.nan
+
+class RollingMoments:
+    ''' Mean and population variance of the last period values (Welford's algorithm with removal) '''
+    def __init__(self, period: int):
+        self.period = period
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._undo = None
+
+    def update(self, x, replace=False):
+        if replace:
+            self.mean, self.m2, removed = self._undo
+            self.values.pop()
+            if removed is not None:
+                self.values.appendleft(removed)
+        removed = self.values.popleft() if len(self.values) == self.period else None
+        self._undo = (self.mean, self.m2, removed)
+        if removed is not None:
+            self._remove(removed)
+        self.values.append(x)
+        delta = x - self.mean
+        self.mean += delta / len(self.values)
+        self.m2 += delta * (x - self.mean)
+        return self.mean if len(self.values) == self.period else np.nan
+
+    def _remove(self, x):
+        n = len(self.values)
+        if n == 0:
+            self.mean, self.m2 = 0.0, 0.0
+            return
+        mean = self.mean - (x - self.mean) / n
+        self.m2 -= (x - self.mean) * (x - mean)
+        self.mean = mean
+
+    @property
+    def std(self):
+        if len(self.values) < self.period:
+            return np.nan
+        return np.sqrt(max(self.m2, 0.0) / self.period)
+
+class RollingExtremum:
+    ''' Maximum (or minimum) of the last period values - monotonic deque, amortized O(1) '''
+    def __init__(self, period: int, is_max=True):
+        self.period = period
+        self.is_max = is_max
+        self.items = deque() # (index, value), values are decreasing (increasing for minimum)
+        self.idx = -1
+        self._undo = []
+
+    def update(self, x, replace=False):
+        if replace:
+            # remove the replaced value and restore values it has pushed out
+            self.items.pop()
+            self.items.extend(reversed(self._undo))
+        else:
+            self.idx += 1
+            while self.items and self.items[0][0] <= self.idx - self.period:
+                self.items.popleft()
+        self._undo = []
+        while self.items and (self.items[-1][1] <= x if self.is_max else self.items[-1][1] >= x):
+            self._undo.append(self.items.pop())
+        self.items.append((self.idx, x))
+        return self.value
+
+    @property
+    def value(self):
+        return self.items[0][1] if self.idx >= self.period - 1 else np.nan
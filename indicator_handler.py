@@ -1,9 +1,12 @@
+import json
+import os
 from collections import OrderedDict
-from copy import deepcopy
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from uuid import uuid4
 from inspect import getmembers, isclass
 
+import numpy as np
 import pandas as pd
 
 import data_manager as dm
@@ -21,61 +24,253 @@ class IndicatorHandler:
     def __init__(self):
         self.data = dm.data
         self.data_idx = 0
-        self.indicators = OrderedDict()
+        self.indicators = OrderedDict() # in topological order - dependencies are added before indicators using them
+        self.output_keys = {} # (indicator id, output key)
+        self.modules = {} # (indicator id, (indicator module, parameters))
+        self.nodes = {} # (output key, indicator id) - indicators with the same module and parameters are shared
+        self.aliases = {} # (indicator name, indicator id) - other names shared indicators were added with
+        self.graph = {} # (indicator id, ids of its dependencies)
+        self._adding = [] # output keys of indicators being added (dependency path), used to detect cycles
+        self.precomputed_outputs = {} # (output key, output)
+        # if max_workers > 1, independent indicators (the same topological level) are updated on a thread pool,
+        # which pays off for indicators spending their time in NumPy (it releases GIL)
+        self.max_workers = 0
+        self._executor = None
+        self._levels = None # indicators grouped by topological level, built on first parallel update
+        # outputs are loaded from and stored to output cache (IndicatorCache) if it is set
+        self.output_cache = None
+        self.cache_entries = {} # (indicator id, (cache key, number of stored bars))
+        self.timeframes = {} # (timeframe, data_manager.Timeframe) - resampled once, shared by indicators of the timeframe
+
+    @property
+    def warmup(self):
+        ''' Number of bars before initial frame needed to initialize indicators (warmup of higher timeframe is in its bars) '''
+        return max([indicator.get_warmup() if indicator.timeframe_data is None else indicator.timeframe_data.get_base_bars(indicator.get_warmup())
+                    for indicator in self.indicators.values()], default=SystemIndicator.WARMUP)
 
     # must be called before add_indicator to set init data_idx
     def set_init_frame(self, data_idx):
+        ''' Indicators which are already added are initialized again (e.g. data was reloaded with more warmup bars) '''
         self.data_idx = data_idx
+        self.timeframes = {}
+        self.cache_entries = {}
+        for indicator_id, indicator in self.indicators.items():
+            self._init_indicator(indicator_id, indicator, indicator.lazy)
 
-    # TODO: check for circular dependencies
-    def add_indicator(self, indicator_name: str, indicator_module: str, indicator_parameters: Dict):
-        print("[IndicatorHandler] Adding indicator '{}' from {}".format(indicator_name, indicator_module))
-
+    def add_indicator(self, indicator_name: str, indicator_module: str, indicator_parameters: Dict, lazy=False):
+        '''
+        Add indicator together with its dependencies (recursively). Indicators form a dependency graph - indicator with
+        the same module and parameters as already added one is not created again, the existing one is returned
+        (so it is updated once per frame no matter how many indicators and traders depend on it).
+        Circular dependency raises ValueError.
+        Lazy indicator (and its dependencies) is calculated only for bars which are read (see SystemIndicator.set_lazy),
+        indicator shared with not lazy one is not lazy.
+        '''
         indicator_def = self._get_indicator_def(indicator_module)
-        default_parameters = deepcopy(indicator_def.parameters_def)
-        
-        # update default parameters with given parameters 
-        indicator_def.parameters_def.update(indicator_parameters)
-        indicator_parameters = indicator_def.parameters_def
-
-        # if number of parameters have increased, that means that some parameters were not declared beforehand (invalid)
-        if len(indicator_parameters) > len(default_parameters):
-            raise ValueError("[IndicatorHandler] Invalid parameters: ", set(indicator_parameters) - set(default_parameters))
-
-        depedency_indicators = []
-        for dependency_name, dependency in indicator_def.dependencies.items():
-            # TODO: try catch in case dependency is missing required fields
-            dependency_indicator = self.add_indicator(dependency_name, dependency['indicator'], dependency['parameters'], self.data_idx)
-            depedency_indicators.append( dependency_indicator )
+
+        # parameters which were not declared in indicator module are invalid ('timeframe' is accepted by every indicator)
+        invalid_parameters = set(indicator_parameters) - set(indicator_def.parameters_def) - {'timeframe'}
+        if invalid_parameters:
+            raise ValueError("[IndicatorHandler] Invalid parameters: ", invalid_parameters)
+
+        # update default parameters with given parameters (defaults of module are not changed)
+        indicator_parameters = dict(indicator_def.parameters_def, **indicator_parameters)
+        timeframe = indicator_parameters.get('timeframe') or indicator_def.indicator_class.TIMEFRAME
+
+        output_key = IndicatorHandler.get_output_key(indicator_module, indicator_parameters)
+        if output_key in self.nodes:
+            indicator = self.indicators[self.nodes[output_key]]
+            print("[IndicatorHandler] Indicator '{}' from {} is shared with '{}'".format(indicator_name, indicator_module, indicator.name))
+            if indicator_name != indicator.name:
+                self.aliases[indicator_name] = self.nodes[output_key]
+            if not lazy:
+                IndicatorHandler._set_eager(indicator)
+            return indicator
+        if output_key in self._adding:
+            path = self._adding[self._adding.index(output_key):] + [output_key]
+            raise ValueError("[IndicatorHandler] Circular dependency: {}".format(' -> '.join(path)))
+
+        print("[IndicatorHandler] Adding indicator '{}' from {}".format(indicator_name, indicator_module))
+        self._adding.append(output_key)
+        try:
+            depedency_indicators = OrderedDict()
+            for dependency_name, dependency in indicator_def.dependencies.items():
+                # TODO: try catch in case dependency is missing required fields
+                # dependency is calculated on timeframe of indicator (bars of both are the same)
+                dependency_parameters = dependency['parameters']
+                if timeframe is not None and 'timeframe' not in dependency_parameters:
+                    dependency_parameters = dict(dependency_parameters, timeframe=timeframe)
+                dependency_indicator = self.add_indicator(dependency_name, dependency['indicator'], dependency_parameters, lazy)
+                if dependency_indicator.get_timeframe() != timeframe:
+                    raise ValueError("[IndicatorHandler] Dependency '{}' of '{}' has different timeframe: {} (indicator: {})".format(
+                        dependency_name, indicator_name, dependency_indicator.get_timeframe(), timeframe))
+                depedency_indicators[dependency_name] = dependency_indicator
+        finally:
+            self._adding.pop()
 
         indicator = indicator_def.indicator_class(indicator_name, indicator_parameters)
         indicator.set_depending_indicators(depedency_indicators)
-        indicator.init(self.data_idx)
 
-        self.indicators[str(uuid4())] = indicator
+        indicator_id = str(uuid4())
+        self.output_keys[indicator_id] = output_key
+        self.modules[indicator_id] = (indicator_module, indicator_parameters)
+        self._init_indicator(indicator_id, indicator, lazy)
+
+        # dependencies are already added, so insertion order of indicators is topological order
+        self.indicators[indicator_id] = indicator
+        self.nodes[output_key] = indicator_id
+        self._levels = None
+        self.graph[indicator_id] = [self._get_indicator_id(dependency) for dependency in depedency_indicators.values()]
 
         return indicator
 
+    def get_named_indicators(self) -> Dict[str, SystemIndicator]:
+        ''' Indicators keyed by name - shared indicator is included under every name it was added with '''
+        named = OrderedDict((indicator.name, indicator) for indicator in self.indicators.values())
+        for indicator_name, indicator_id in self.aliases.items():
+            named.setdefault(indicator_name, self.indicators[indicator_id])
+        return named
+
+    @staticmethod
+    def get_output_key(indicator_module: str, indicator_parameters: Dict) -> str:
+        ''' Indicator output is defined by indicator module and its parameters (for the same data) '''
+        if indicator_module.endswith('.py'):
+            indicator_module = os.path.realpath(indicator_module)
+        return '{}:{}'.format(indicator_module, json.dumps(indicator_parameters, sort_keys=True, default=str))
+
+    def get_outputs(self) -> Dict[str, np.ndarray]:
+        '''
+        Outputs of indicators keyed by output key - outputs can be set as precomputed_outputs of other indicator handler
+        with the same data loaded, its indicators with the same module and parameters then skip calculation.
+        Outputs of indicators which do not persist their output are not included (output depends on current bar).
+        Outputs computed in tick mode should not be reused, since output of a bar is updated during the bar.
+        '''
+        for indicator in self.indicators.values():
+            indicator.evaluate(0, indicator.data_idx)
+        return {self.output_keys[indicator_id]: np.asarray(indicator.output)
+                for indicator_id, indicator in self.indicators.items() if indicator.parameters.PERSIST}
+
+    def store_outputs(self):
+        ''' Store outputs of bars up to current frame into output cache (only if there are more bars than already stored) '''
+        if self.output_cache is None:
+            return
+        for indicator_id, (cache_key, stored_rows) in self.cache_entries.items():
+            indicator = self.indicators[indicator_id]
+            rows = self.data_idx + 1
+            if indicator.lazy and not indicator.computed[:rows].all():
+                # only bars calculated so far (lazy indicator) are stored
+                rows = int(np.argmin(indicator.computed[:rows]))
+            if rows > stored_rows:
+                self.output_cache.store(cache_key, self.data, indicator.output, rows)
+                self.cache_entries[indicator_id] = (cache_key, rows)
+
     def update(self, framedata):
         self.data_idx = framedata.core_data_idx
-        input_data = self.data[0:self.data_idx+1]
-        input_data.reverse() # resets index
-
-        # TODO: BENCHMARK
-        if framedata.curr_candle is not None:
-            current_candle = pd.DataFrame({'Date':  framedata.curr_candle.Date,
-                                           'Open':  framedata.curr_candle.Open,
-                                           'High':  framedata.curr_candle.High,
-                                           'Low':   framedata.curr_candle.Low,
-                                           'Close': framedata.curr_candle.Close},  index=[0])
-            # add current candle to input data at index=0
-            input_data = dm.DataView(input_data[1::], current_candle)
+        # index 0 is the latest bar, current candle (if any) replaces it
+        input_data = dm.DataView(self.data, self.data_idx, framedata.curr_candle)
+        # input data of every timeframe - bar of higher timeframe is built from base bars up to the current one
+        frames = {None: input_data}
+        for timeframe_data in self.timeframes.values():
+            frames[timeframe_data] = timeframe_data.get_input_data(self.data_idx, framedata.curr_candle)
+
+        if self.max_workers > 1 and len(self.indicators) > 1:
+            self._update_parallel(frames)
         else:
-            input_data = dm.DataView(input_data)
+            # topological order - every indicator is updated once, after all of its dependencies
+            for indicator in self.indicators.values():
+                IndicatorHandler._update_indicator(indicator, frames)
 
-        for indicator in self.indicators.values():
-            indicator.update(input_data, self.data_idx)
+    def _init_indicator(self, indicator_id, indicator, lazy):
+        ''' Initialize indicator at init frame - from precomputed outputs, output cache or by calculation '''
+        indicator_module, indicator_parameters = self.modules[indicator_id]
+        timeframe = indicator.get_timeframe()
+        if timeframe is not None:
+            self._init_timeframe_indicator(indicator, timeframe, lazy)
+            return
+
+        output = self.precomputed_outputs.get(self.output_keys[indicator_id])
+        if output is not None and indicator.parameters.PERSIST and output.shape[0] == self.data.shape[0]:
+            indicator.set_precomputed_output(output, self.data_idx)
+        elif self.output_cache is not None and indicator.parameters.PERSIST:
+            cache_key = self.output_cache.get_key(indicator_module, indicator_parameters, self.data, self.data_idx)
+            cached = self.output_cache.load(cache_key, self.data)
+            if cached is None:
+                indicator.init(self.data_idx)
+                self.cache_entries[indicator_id] = (cache_key, 0)
+            else:
+                indicator.set_cached_output(cached[0], cached[1], self.data_idx)
+                self.cache_entries[indicator_id] = (cache_key, cached[1])
+        else:
+            indicator.init(self.data_idx)
+        if lazy:
+            indicator.set_lazy()
+
+    @staticmethod
+    def _update_indicator(indicator, frames):
+        ''' Update with input data of indicator timeframe, bounded to its lookback (if it is declared) '''
+        input_data = frames[indicator.timeframe_data]
+        indicator.update(input_data.window(indicator.get_lookback()), input_data.end_idx)
+
+    def _init_timeframe_indicator(self, indicator, timeframe, lazy):
+        '''
+        Indicator on higher timeframe is initialized with bars completed before initial frame, then updated with
+        in-progress bar of initial frame. Its outputs are not cached (output of a bar is updated during the bar).
+        '''
+        if timeframe not in self.timeframes:
+            self.timeframes[timeframe] = dm.Timeframe(self.data, timeframe)
+        timeframe_data = self.timeframes[timeframe]
+        indicator.set_timeframe(timeframe_data)
+        input_data = timeframe_data.get_input_data(self.data_idx)
+        indicator.init(input_data.end_idx - 1)
+        if lazy:
+            indicator.set_lazy()
+        indicator.update(input_data.window(indicator.get_lookback()), input_data.end_idx)
+
+    def get_levels(self) -> List[List[str]]:
+        ''' Indicator ids grouped by topological level - level 0 has no dependencies, level n depends only on lower levels '''
+        levels = {}
+        for indicator_id, dependencies in self.graph.items():
+            levels[indicator_id] = 1 + max([levels[dependency] for dependency in dependencies], default=-1)
+        groups = [[] for _ in range(max(levels.values(), default=-1) + 1)]
+        for indicator_id, level in levels.items():
+            groups[level].append(indicator_id)
+        return groups
+
+    def close(self):
+        ''' Shut down thread pool of parallel update (it is started again on next parallel update) '''
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _update_parallel(self, frames):
+        ''' Levels are updated one after another, indicators of a level in parallel - every one writes only its own output '''
+        if self._levels is None:
+            self._levels = [[self.indicators[indicator_id] for indicator_id in level] for level in self.get_levels()]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='IndicatorHandler')
+
+        for level in self._levels:
+            if len(level) == 1:
+                IndicatorHandler._update_indicator(level[0], frames)
+            else:
+                # wait for the whole level, exception of any indicator is raised here
+                for _ in self._executor.map(lambda indicator: IndicatorHandler._update_indicator(indicator, frames), level):
+                    pass
+
+
+    @staticmethod
+    def _set_eager(indicator):
+        ''' Indicator (and its dependencies, they are read on every update) is calculated on every frame again '''
+        if indicator.lazy:
+            indicator.evaluate(0, indicator.data_idx)
+            indicator.set_lazy(False)
+        for dependency in (indicator.depending_indicators or {}).values():
+            IndicatorHandler._set_eager(dependency)
 
+    def _get_indicator_id(self, indicator):
+        for indicator_id, value in self.indicators.items():
+            if value is indicator:
+                return indicator_id
 
     def _get_indicator_def(self, indicator_module_name: str):
         indicator_module = import_module(indicator_module_name) #importlib.import_module = __import__('indicators', globals(), locals()) #indicator_module_name) #TODO: Obsidian
@@ -0,0 +1,28 @@
+from indicator import SystemIndicator
+from indicator_functions import atr, WilderState
+
+dependencies = {}
+
+parameters = {
+    'period': 14,
+}
+
+class ATR(SystemIndicator):
+    ''' Average true range with Wilder's smoothing '''
+
+    def compute_all(self, data):
+        return atr(data.High, data.Low, data.Close, self.period)
+
+    def reset_state(self):
+        self.atr = WilderState(self.period)
+        self.close = None
+        self.prev_close = None
+
+    def on_bar(self, bar, replace):
+        if not replace:
+            self.prev_close = self.close
+        self.close = bar.Close
+        true_range = bar.High - bar.Low
+        if self.prev_close is not None:
+            true_range = max(true_range, abs(bar.High - self.prev_close), abs(bar.Low - self.prev_close))
+        return self.atr.update(true_range, replace)
@@ -0,0 +1,29 @@
+from indicator import SystemIndicator
+from indicator_functions import bollinger_bands, RollingMoments
+
+dependencies = {}
+
+parameters = {
+    'period': 20,
+    'deviations': 2.0,
+    'source': 'Close',
+    'visualization': [{'COLOR': '#1f77b4'}, {'COLOR': '#2ca02c'}, {'COLOR': '#d62728'}], # middle, upper, lower
+}
+
+class BollingerBands(SystemIndicator):
+    ''' Bollinger Bands - SMA (middle band) +/- deviations * standard deviation over period bars '''
+    OUTPUTS = ['middle', 'upper', 'lower']
+
+    def get_lookback(self):
+        return self.period
+
+    def compute_all(self, data):
+        return bollinger_bands(data[self.source], self.period, self.deviations)
+
+    def reset_state(self):
+        self.moments = RollingMoments(self.period)
+
+    def on_bar(self, bar, replace):
+        middle = self.moments.update(getattr(bar, self.source), replace)
+        deviation = self.deviations * self.moments.std
+        return (middle, middle + deviation, middle - deviation)
@@ -0,0 +1,21 @@
+from indicator import SystemIndicator
+from indicator_functions import ema, EmaState
+
+dependencies = {}
+
+parameters = {
+    'period': 20,
+    'source': 'Close',
+}
+
+class EMA(SystemIndicator):
+    ''' Exponential moving average of source column (alpha = 2 / (period + 1)) '''
+
+    def compute_all(self, data):
+        return ema(data[self.source], self.period)
+
+    def reset_state(self):
+        self.ema = EmaState(self.period)
+
+    def on_bar(self, bar, replace):
+        return self.ema.update(getattr(bar, self.source), replace)
@@ -18,6 +18,9 @@ class IndicatorExample(SystemIndicator):
     def initialize(self, data) -> List[Number]: #optional
         return [data[0].Close]
 
+    def compute_all(self, data): #optional - vectorized initialize of all bars at once
+        return data.Close
+
     def calculate(self, data) -> List[Number]:
         # print(self[1])
         return [data[0].Close]
\ No newline at end of file
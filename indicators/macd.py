@@ -0,0 +1,37 @@
+import numpy as np
+
+from indicator import SystemIndicator
+from indicator_functions import macd, EmaState
+
+dependencies = {}
+
+parameters = {
+    'fast': 12,
+    'slow': 26,
+    'signal': 9,
+    'source': 'Close',
+    'visualization': [{'COLOR': '#1f77b4'}, {'COLOR': '#ff7f0e'}, {'COLOR': '#7f7f7f'}], # macd, signal, histogram
+}
+
+class MACD(SystemIndicator):
+    ''' Moving average convergence divergence - EMA(fast) - EMA(slow), its EMA(signal) and their difference '''
+    OUTPUTS = ['macd', 'signal', 'histogram']
+
+    def compute_all(self, data):
+        return macd(data[self.source], self.fast, self.slow, self.signal)
+
+    def reset_state(self):
+        self.fast_ema = EmaState(self.fast, min_periods=1)
+        self.slow_ema = EmaState(self.slow, min_periods=1)
+        self.signal_ema = EmaState(self.signal)
+        self.count = 0
+
+    def on_bar(self, bar, replace):
+        if not replace:
+            self.count += 1
+        price = getattr(bar, self.source)
+        macd_value = self.fast_ema.update(price, replace) - self.slow_ema.update(price, replace)
+        if self.count < self.slow:
+            return (np.nan, np.nan, np.nan)
+        signal = self.signal_ema.update(macd_value, replace)
+        return (macd_value, signal, macd_value - signal)
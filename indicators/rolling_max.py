@@ -0,0 +1,24 @@
+from indicator import SystemIndicator
+from indicator_functions import rolling_max, RollingExtremum
+
+dependencies = {}
+
+parameters = {
+    'period': 20,
+    'source': 'High',
+}
+
+class RollingMax(SystemIndicator):
+    ''' Highest value of source column over period bars '''
+
+    def get_lookback(self):
+        return self.period
+
+    def compute_all(self, data):
+        return rolling_max(data[self.source], self.period)
+
+    def reset_state(self):
+        self.highest = RollingExtremum(self.period, is_max=True)
+
+    def on_bar(self, bar, replace):
+        return self.highest.update(getattr(bar, self.source), replace)
@@ -0,0 +1,24 @@
+from indicator import SystemIndicator
+from indicator_functions import rolling_min, RollingExtremum
+
+dependencies = {}
+
+parameters = {
+    'period': 20,
+    'source': 'Low',
+}
+
+class RollingMin(SystemIndicator):
+    ''' Lowest value of source column over period bars '''
+
+    def get_lookback(self):
+        return self.period
+
+    def compute_all(self, data):
+        return rolling_min(data[self.source], self.period)
+
+    def reset_state(self):
+        self.lowest = RollingExtremum(self.period, is_max=False)
+
+    def on_bar(self, bar, replace):
+        return self.lowest.update(getattr(bar, self.source), replace)
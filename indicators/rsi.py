@@ -0,0 +1,37 @@
+import numpy as np
+
+from indicator import SystemIndicator
+from indicator_functions import rsi, WilderState
+
+dependencies = {}
+
+parameters = {
+    'period': 14,
+    'source': 'Close',
+}
+
+class RSI(SystemIndicator):
+    ''' Relative strength index (0 - 100) with Wilder's smoothing of gains and losses '''
+
+    def compute_all(self, data):
+        return rsi(data[self.source], self.period)
+
+    def reset_state(self):
+        self.gain = WilderState(self.period)
+        self.loss = WilderState(self.period)
+        self.price = None
+        self.prev_price = None
+
+    def on_bar(self, bar, replace):
+        if not replace:
+            self.prev_price = self.price
+        self.price = getattr(bar, self.source)
+        if self.prev_price is None:
+            return np.nan
+
+        change = self.price - self.prev_price
+        gain = self.gain.update(max(change, 0.0), replace)
+        loss = self.loss.update(max(-change, 0.0), replace)
+        if np.isnan(gain):
+            return np.nan
+        return 100.0 * gain / (gain + loss) if gain + loss > 0 else 50.0
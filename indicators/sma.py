@@ -0,0 +1,24 @@
+from indicator import SystemIndicator
+from indicator_functions import sma, RollingWindow
+
+dependencies = {}
+
+parameters = {
+    'period': 20,
+    'source': 'Close',
+}
+
+class SMA(SystemIndicator):
+    ''' Simple moving average of source column over period bars '''
+
+    def get_lookback(self):
+        return self.period
+
+    def compute_all(self, data):
+        return sma(data[self.source], self.period)
+
+    def reset_state(self):
+        self.window = RollingWindow(self.period)
+
+    def on_bar(self, bar, replace):
+        return self.window.update(getattr(bar, self.source), replace)
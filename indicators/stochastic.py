@@ -0,0 +1,38 @@
+import numpy as np
+
+from indicator import SystemIndicator
+from indicator_functions import stochastic, RollingExtremum, RollingWindow
+
+dependencies = {}
+
+parameters = {
+    'k_period': 14,
+    'd_period': 3,
+    'visualization': [{'COLOR': '#1f77b4'}, {'COLOR': '#ff7f0e'}], # %K, %D
+}
+
+class Stochastic(SystemIndicator):
+    ''' Stochastic oscillator - %K is position of close within high-low range of k_period bars, %D is SMA of %K '''
+    OUTPUTS = ['k', 'd']
+
+    def get_lookback(self):
+        return self.k_period + self.d_period - 1
+
+    def compute_all(self, data):
+        return stochastic(data.High, data.Low, data.Close, self.k_period, self.d_period)
+
+    def reset_state(self):
+        self.highest = RollingExtremum(self.k_period, is_max=True)
+        self.lowest = RollingExtremum(self.k_period, is_max=False)
+        self.d = RollingWindow(self.d_period)
+        self.count = 0
+
+    def on_bar(self, bar, replace):
+        if not replace:
+            self.count += 1
+        highest = self.highest.update(bar.High, replace)
+        lowest = self.lowest.update(bar.Low, replace)
+        if self.count < self.k_period:
+            return (np.nan, np.nan)
+        k = 100.0 * (bar.Close - lowest) / (highest - lowest) if highest > lowest else 50.0
+        return (k, self.d.update(k, replace))
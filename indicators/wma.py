@@ -0,0 +1,24 @@
+from indicator import SystemIndicator
+from indicator_functions import wma, WmaState
+
+dependencies = {}
+
+parameters = {
+    'period': 20,
+    'source': 'Close',
+}
+
+class WMA(SystemIndicator):
+    ''' Linearly weighted moving average of source column over period bars '''
+
+    def get_lookback(self):
+        return self.period
+
+    def compute_all(self, data):
+        return wma(data[self.source], self.period)
+
+    def reset_state(self):
+        self.wma = WmaState(self.period)
+
+    def on_bar(self, bar, replace):
+        return self.wma.update(getattr(bar, self.source), replace)
@@ -0,0 +1,326 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+from itertools import product
+from math import ceil
+from time import time
+from typing import Callable, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+import data_manager as dm
+from backtest import ModuleConfig, RunConfig, setup_simulator, build_simulator, run_backtest, get_metrics
+from result_cache import ResultCache
+from shared_data import SharedArrays, SharedData, attach_all, open_arrays
+
+'''
+Trader parameter optimization - every evaluated parameter set is a separate headless simulation.
+Simulations are fanned out across a process pool, every worker process keeps loaded data between runs
+(DataManager does not reload data which is already loaded), so a run costs only the simulation itself.
+With share_data, data is loaded once by the parent process and workers attach to it in shared memory,
+so memory used by data does not grow with number of workers. Outputs of indicators (config indicators and
+dependencies of the trader) are then also computed once by the parent process and reused by all runs.
+'''
+
+def expand_grid(grid: Dict[str, List]) -> List[Dict]:
+    ''' Expand parameter grid {name: [values]} to list of parameter dicts (cartesian product) '''
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+
+def get_sweep_config(config: RunConfig, trader_module: str, parameters: Dict, trader_name='trader'):
+    ''' Copy of config in which traders are replaced with given trader module and parameters '''
+    config = deepcopy(config)
+    config.traders = [ModuleConfig(trader_name, trader_module, parameters)]
+    return config
+
+def get_window_config(config: RunConfig, start_time, stop_time):
+    ''' Copy of config with different simulated window '''
+    config = deepcopy(config)
+    config.start_time = pd.Timestamp(start_time)
+    config.stop_time = pd.Timestamp(stop_time)
+    return config
+
+
+def precompute_indicators(config: RunConfig, trader_module: str = None) -> Dict[str, np.ndarray]:
+    '''
+    Run config indicators and dependencies of trader module over config window (in this process),
+    returns their outputs keyed by output key (see IndicatorHandler.get_outputs)
+    '''
+    sim = setup_simulator(config)
+    for indicator in config.indicators:
+        sim.add_indicator(indicator.name, indicator.module, indicator.parameters)
+    if trader_module is not None:
+        for name, dependency in sim.trader_handler._get_trader_def(trader_module).dependencies.items():
+            sim.add_indicator(name, dependency['indicator'], dependency['parameters'])
+    sim.run_headless()
+    return sim.indicator_handler.get_outputs()
+
+def publish_data(config: RunConfig, trader_module: str = None):
+    '''
+    Load data of config in this process and publish it to shared memory, returns list of SharedArrays:
+    data, tick data (None if ticks are not used) and precomputed indicator outputs (None in tick mode,
+    since output of a bar changes during the bar).
+    '''
+    shared = [None, None, None]
+    try:
+        if not config.use_ticks:
+            shared[2] = SharedArrays(precompute_indicators(config, trader_module))
+        setup_simulator(config)
+        shared[0] = SharedData(dm.data)
+        if config.use_ticks:
+            shared[1] = SharedData(dm.tick_data)
+    except Exception:
+        close_shared(shared)
+        raise
+    return shared
+
+def close_shared(shared):
+    for s in shared:
+        if s is not None:
+            s.close()
+
+
+# indicator outputs published by parent process (set in worker processes by _init_worker)
+_precomputed_outputs = None
+
+def _init_worker(data_handle, tick_data_handle, outputs_handle):
+    global _precomputed_outputs
+    attach_all(data_handle, tick_data_handle)
+    _precomputed_outputs = open_arrays(outputs_handle) if outputs_handle is not None else None
+
+def _get_executor(max_workers, shared):
+    if not shared:
+        return ProcessPoolExecutor(max_workers=max_workers)
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                               initargs=tuple(None if s is None else s.handle for s in shared))
+
+# result caches used by this process (cache_dir, ResultCache)
+_result_caches = {}
+
+def _run_sweep_task(config: RunConfig, return_result=False, cache_dir=None):
+    start = time()
+    if cache_dir is None:
+        result = run_backtest(config, _precomputed_outputs)
+    else:
+        if cache_dir not in _result_caches:
+            _result_caches[cache_dir] = ResultCache(cache_dir)
+        result = _result_caches[cache_dir].run(config, _precomputed_outputs)
+    metrics = get_metrics(result)
+    metrics['run_time'] = time() - start
+    return (metrics, result) if return_result else metrics
+
+
+def sweep(trader_module: str, parameters: Union[Dict[str, List], List[Dict]], config: RunConfig, max_workers=None, share_data=False,
+          cache_dir=None):
+    '''
+    Evaluate trader over parameter grid ({name: [values]}) or list of parameter dicts.
+    Config provides data files, time window and indicators (its traders are replaced by swept trader).
+    Runs are executed on a process pool (max_workers defaults to number of CPUs) and (parameters, metrics)
+    are yielded as soon as runs finish - metrics are None if run has failed.
+    If share_data is set, workers use data and indicator outputs published to shared memory instead of
+    loading and computing them themselves. If cache_dir is given, results of runs are stored in (and taken from)
+    result cache (see ResultCache).
+    '''
+    parameters_list = expand_grid(parameters) if isinstance(parameters, dict) else list(parameters)
+
+    shared = publish_data(config, trader_module) if share_data else []
+    try:
+        with _get_executor(max_workers, shared) as executor:
+            futures = {executor.submit(_run_sweep_task, get_sweep_config(config, trader_module, p), False, cache_dir): p
+                       for p in parameters_list}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    print('[Optimization] Run with parameters {} failed: {}'.format(futures[future], e))
+                    yield futures[future], None
+    finally:
+        close_shared(shared)
+
+
+'''
+Walk-forward optimization - date range is split into rolling windows, trader parameters are optimized
+on every in-sample window and the best parameters are evaluated on the following out-of-sample window.
+Out-of-sample windows follow each other, so their equity curves are stitched into one curve, which
+shows how the strategy (together with its periodic re-optimization) would have performed.
+'''
+
+def get_walk_forward_windows(start_time, stop_time, in_sample, out_of_sample, anchored=False):
+    '''
+    Returns list of (in-sample start, out-of-sample start, out-of-sample stop) - in-sample window ends where
+    out-of-sample window starts. in_sample and out_of_sample are lengths of windows - pandas Timedelta
+    (or string like '365D') or DateOffset (e.g. pd.DateOffset(months=6)). In-sample windows roll forward
+    by out_of_sample, if anchored is set they all start at start_time (expanding window) instead.
+    The last out-of-sample window is cut at stop_time.
+    '''
+    start_time, stop_time = pd.Timestamp(start_time), pd.Timestamp(stop_time)
+    in_sample = in_sample if isinstance(in_sample, pd.DateOffset) else pd.Timedelta(in_sample)
+    out_of_sample = out_of_sample if isinstance(out_of_sample, pd.DateOffset) else pd.Timedelta(out_of_sample)
+
+    in_sample_start = start_time
+    out_of_sample_start = start_time + in_sample
+    if out_of_sample_start <= start_time or out_of_sample_start + out_of_sample <= out_of_sample_start:
+        raise ValueError('[Optimization] In-sample and out-of-sample lengths must be positive')
+
+    windows = []
+    while out_of_sample_start < stop_time:
+        out_of_sample_stop = min(out_of_sample_start + out_of_sample, stop_time)
+        windows.append((in_sample_start, out_of_sample_start, out_of_sample_stop))
+        out_of_sample_start = out_of_sample_stop
+        if not anchored:
+            in_sample_start = out_of_sample_start - in_sample
+
+    if not windows:
+        raise ValueError('[Optimization] Date range is shorter than in-sample window')
+    return windows
+
+class WalkForwardWindow:
+    def __init__(self, in_sample_start, out_of_sample_start, out_of_sample_stop):
+        self.in_sample_start = in_sample_start
+        self.out_of_sample_start = out_of_sample_start
+        self.out_of_sample_stop = out_of_sample_stop
+        self.parameters = None              # best in-sample parameters
+        self.in_sample_metrics = None       # metrics of run with best parameters
+        self.out_of_sample_metrics = None
+        self.out_of_sample_result = None    # BacktestResult
+
+class WalkForwardResult:
+    ''' Windows with selected parameters and stitched out-of-sample equity curve (time, balance, orders) '''
+    def __init__(self, windows: List[WalkForwardWindow], start_balance):
+        self.windows = windows
+        results = [window.out_of_sample_result for window in windows if window.out_of_sample_result is not None]
+
+        # every out-of-sample run starts with start balance - balance changes are chained
+        balance = []
+        offset = 0.0
+        for result in results:
+            balance.append(result.balance + offset)
+            offset = balance[-1][-1] - start_balance
+        self.time = np.concatenate([result.time for result in results]) if results else np.array([], dtype='datetime64[ns]')
+        self.balance = np.concatenate(balance) if results else np.array([start_balance])
+
+        self.orders = {}
+        for result in results:
+            for trader_name, orders in result.orders.items():
+                self.orders.setdefault(trader_name, []).extend(orders)
+
+def walk_forward(trader_module: str, parameters: Union[Dict[str, List], List[Dict]], config: RunConfig,
+                 in_sample, out_of_sample, metric='final_balance', anchored=False, max_workers=None, cache_dir=None) -> WalkForwardResult:
+    '''
+    Walk-forward optimization of trader over parameter grid ({name: [values]}) or list of parameter dicts.
+    Config provides data files, whole date range (start and stop time) and indicators, for windows see
+    get_walk_forward_windows. Parameters with the highest in-sample metric (see backtest.get_metrics) are selected.
+    In-sample runs of all windows are executed in parallel on one process pool, out-of-sample run of a window
+    is submitted as soon as its in-sample runs finish. Data of the whole date range is loaded once and shared
+    with workers and indicator outputs are computed once over the whole date range, so overlapping windows
+    reuse them instead of computing them again (except in tick mode). If cache_dir is given, results of runs
+    are stored in (and taken from) result cache (see ResultCache).
+    '''
+    parameters_list = expand_grid(parameters) if isinstance(parameters, dict) else list(parameters)
+    windows = [WalkForwardWindow(*window) for window in
+               get_walk_forward_windows(config.start_time, config.stop_time, in_sample, out_of_sample, anchored)]
+
+    shared = publish_data(get_window_config(config, windows[0].in_sample_start, windows[-1].out_of_sample_stop), trader_module)
+    try:
+        with _get_executor(max_workers, shared) as executor:
+            in_sample_futures = {}
+            for window in windows:
+                window_config = get_window_config(config, window.in_sample_start, window.out_of_sample_start)
+                for p in parameters_list:
+                    in_sample_futures[executor.submit(_run_sweep_task, get_sweep_config(window_config, trader_module, p), False, cache_dir)] = (window, p)
+
+            remaining = {window: len(parameters_list) for window in windows}
+            out_of_sample_futures = {}
+            for future in as_completed(in_sample_futures):
+                window, p = in_sample_futures[future]
+                remaining[window] -= 1
+                try:
+                    metrics = future.result()
+                    if window.in_sample_metrics is None or metrics[metric] > window.in_sample_metrics[metric]:
+                        window.parameters, window.in_sample_metrics = p, metrics
+                except Exception as e:
+                    print('[Optimization] In-sample run from {} with parameters {} failed: {}'.format(window.in_sample_start, p, e))
+
+                if remaining[window] == 0 and window.parameters is not None:
+                    window_config = get_window_config(config, window.out_of_sample_start, window.out_of_sample_stop)
+                    out_of_sample_futures[window] = executor.submit(_run_sweep_task, get_sweep_config(window_config, trader_module, window.parameters), True, cache_dir)
+
+            for window in windows:
+                if window not in out_of_sample_futures:
+                    print('[Optimization] No parameters selected for window starting at {}'.format(window.in_sample_start))
+                    continue
+                try:
+                    window.out_of_sample_metrics, window.out_of_sample_result = out_of_sample_futures[window].result()
+                except Exception as e:
+                    print('[Optimization] Out-of-sample run from {} failed: {}'.format(window.out_of_sample_start, e))
+    finally:
+        close_shared(shared)
+
+    return WalkForwardResult(windows, config.start_balance)
+
+
+'''
+Successive halving - all candidates are run on a short prefix of the window, the worse part of them is pruned
+and survivors are extended to a longer prefix, until the whole window is reached. Survivors continue from
+checkpointed simulator state (Simulator.save_state) instead of simulating the prefix again.
+'''
+
+def get_metric(result, metric: Union[str, Callable]):
+    ''' Metric of backtest result - key of backtest.get_metrics or function of account balance (1D array of simulated bars) '''
+    return metric(result.balance) if callable(metric) else get_metrics(result)[metric]
+
+def _run_halving_task(config: RunConfig, stop_time, metric, state=None):
+    sim = build_simulator(config, _precomputed_outputs)
+    if state is not None:
+        sim.load_state(state)
+    result = sim.run_headless(stop_time)
+    return get_metric(result, metric), get_metrics(result), sim.save_state()
+
+def successive_halving(trader_module: str, parameters: Union[Dict[str, List], List[Dict]], config: RunConfig,
+                       metric: Union[str, Callable] = 'final_balance', eta=2, min_fraction=1/16, max_workers=None, share_data=True):
+    '''
+    Search for the best parameters from parameter grid ({name: [values]}) or list of parameter dicts.
+    The first rung runs all candidates on min_fraction of config window, every next rung keeps the best 1/eta
+    of candidates (by metric, higher is better) and runs them on eta times longer window, the last rung runs
+    on the whole window. Metric is a key of backtest.get_metrics or function of account balance (it must be
+    picklable, i.e. defined at module level).
+    Returns list of (parameters, metrics) of the last rung sorted from the best.
+    '''
+    if eta < 2 or not 0 < min_fraction <= 1:
+        raise ValueError('[Optimization] eta must be at least 2 and min_fraction must be in (0, 1]')
+    parameters_list = expand_grid(parameters) if isinstance(parameters, dict) else list(parameters)
+
+    start_time, stop_time = pd.Timestamp(config.start_time), pd.Timestamp(config.stop_time)
+    rungs = 1
+    while min_fraction * eta ** (rungs - 1) < 1:
+        rungs += 1
+
+    # candidate: [parameters, config, metric value, metrics, state]
+    candidates = [[p, get_sweep_config(config, trader_module, p), None, None, None] for p in parameters_list]
+    shared = publish_data(config, trader_module) if share_data else []
+    try:
+        with _get_executor(max_workers, shared) as executor:
+            for rung in range(rungs):
+                fraction = min(1.0, min_fraction * eta ** rung)
+                rung_stop_time = stop_time if fraction >= 1.0 else start_time + (stop_time - start_time) * fraction
+
+                futures = {executor.submit(_run_halving_task, candidate[1], rung_stop_time, metric, candidate[4]): candidate
+                           for candidate in candidates}
+                for future in as_completed(futures):
+                    candidate = futures[future]
+                    try:
+                        candidate[2], candidate[3], candidate[4] = future.result()
+                    except Exception as e:
+                        print('[Optimization] Run with parameters {} failed: {}'.format(candidate[0], e))
+                        candidate[2] = None
+
+                candidates = sorted([candidate for candidate in candidates if candidate[2] is not None], key=lambda candidate: -candidate[2])
+                print('[Optimization] Rung {}/{} (until {}): {} candidates, best {} = {}'.format(
+                      rung + 1, rungs, rung_stop_time, len(futures), metric if isinstance(metric, str) else 'metric',
+                      candidates[0][2] if candidates else None))
+                if rung < rungs - 1:
+                    candidates = candidates[:max(1, ceil(len(candidates) / eta))]
+    finally:
+        close_shared(shared)
+
+    return [(candidate[0], candidate[3]) for candidate in candidates]
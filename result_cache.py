@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import pickle
+from typing import Dict
+
+import pandas as pd
+
+from data_cache import DataCache
+from utils import get_core_hash, get_module_hash
+
+'''
+Content-addressed cache of whole backtest results (BacktestResult - balance, orders and indicator outputs).
+Key of a run is a hash of everything the result depends on:
+ - content of data files (hash is taken from data cache manifest if it is valid, see DataCache)
+ - source of indicator and trader modules (including modules they depend on) and of the simulator itself
+ - resolved parameters of indicators and traders (defaults of module updated with given parameters)
+ - simulated window, tick mode and start balance
+Data backends, parallel indicator update and indicator output cache give identical results, so they are not part of the key.
+Results are stored as one file per key, least recently used entries are removed when cache grows over max_size.
+'''
+class ResultCache:
+    VERSION = 1
+    ''' Simulator modules - their source is part of every key '''
+    CORE_MODULES = ['core_simulator', 'data_manager', 'indicator', 'indicator_functions', 'indicator_handler', 'trader', 'trader_handler', 'utils']
+
+    def __init__(self, cache_dir='.result_cache', max_size=1 << 30):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._core_hash = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict:
+        ''' Hit/miss counts of this cache object and number and total size of stored entries '''
+        entries = self._get_entries()
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate,
+                'entries': len(entries), 'size': sum(entry[2] for entry in entries)}
+
+    def get_key(self, config) -> str:
+        ''' Key of a run described by RunConfig '''
+        h = hashlib.blake2b(digest_size=20)
+        h.update(str(ResultCache.VERSION).encode())
+        h.update(self._get_core_hash().encode())
+        h.update(DataCache(config.data_file).source_hash().encode())
+        if config.use_ticks:
+            h.update(DataCache(config.tick_data_file).source_hash().encode())
+
+        modules = {'indicators': [], 'traders': []}
+        for kind in modules:
+            for module_config in getattr(config, kind):
+                source_hash, parameters = get_module_hash(module_config.module, module_config.parameters)
+                modules[kind].append([module_config.name, source_hash, parameters])
+
+        h.update(json.dumps({
+            'start_time': str(pd.Timestamp(config.start_time)),
+            'stop_time': str(pd.Timestamp(config.stop_time)),
+            'use_ticks': bool(config.use_ticks),
+            'start_balance': float(config.start_balance),
+            'modules': modules
+        }, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def get(self, key: str):
+        ''' Stored BacktestResult or None '''
+        file = self._get_file(key)
+        try:
+            with open(file, 'rb') as f:
+                result = pickle.load(f)
+            os.utime(file) # mark entry as recently used
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result) -> None:
+        file = self._get_file(key)
+        tmp_file = '{}.{}.tmp'.format(file, os.getpid())
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(result, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, file)
+        self.evict()
+
+    def run(self, config, precomputed_outputs=None):
+        ''' Stored result of run described by config, run is simulated (and stored) only on cache miss '''
+        from backtest import run_backtest
+
+        key = self.get_key(config)
+        result = self.get(key)
+        if result is None:
+            result = run_backtest(config, precomputed_outputs)
+            self.put(key, result)
+        return result
+
+    def evict(self) -> None:
+        ''' Remove least recently used entries until total size is not over max_size '''
+        entries = sorted(self._get_entries(), key=lambda entry: entry[1])
+        size = sum(entry[2] for entry in entries)
+        for file, _, file_size in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(file)
+            except OSError:
+                pass
+            size -= file_size
+
+    def clear(self) -> None:
+        for file, _, _ in self._get_entries():
+            os.remove(file)
+
+    def _get_file(self, key):
+        return os.path.join(self.cache_dir, key + '.pkl')
+
+    def _get_entries(self):
+        ''' List of (file, last use time, size) '''
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_mtime_ns, stat.st_size))
+                except OSError:
+                    pass
+        return entries
+
+    def _get_core_hash(self):
+        if self._core_hash is None:
+            self._core_hash = get_core_hash(ResultCache.CORE_MODULES)
+        return self._core_hash
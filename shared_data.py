@@ -0,0 +1,133 @@
+import atexit
+from typing import Dict
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import data_manager as dm
+
+'''
+Market data shared between processes - loaded data of a DataManager (or any dict of arrays, see SharedArrays)
+is published into a single shared memory segment (columns are packed one after another) and other processes attach to it
+read-only, without copying or reading data files again. Only a small picklable SharedDataHandle
+has to be sent to other processes (e.g. as an argument of a process pool initializer).
+
+Parent process:
+    with SharedData(dm.data) as shared:
+        executor = ProcessPoolExecutor(initializer=attach, initargs=(shared.handle, ))
+
+Child process:
+    attach(handle)  # dm.data now holds read-only ArrayFrame backed by shared memory
+
+Segments are removed when SharedData is closed, at the latest when the parent process exits
+(if the parent is killed, multiprocessing resource tracker removes them).
+'''
+
+class SharedDataHandle:
+    ''' Picklable description of published data - segment name and layout of arrays in it '''
+    def __init__(self, name, columns, data_file=None, window=None):
+        self.name = name
+        self.columns = columns  # [(array name, dtype, offset, shape)]
+        self.data_file = data_file
+        self.window = window
+
+    @property
+    def rows(self):
+        return self.columns[0][3][0] if self.columns else 0
+
+class SharedArrays:
+    ''' Publish dict of NumPy arrays (any dtype and shape) into new shared memory segment '''
+    ALIGNMENT = 64
+
+    def __init__(self, arrays: Dict[str, np.ndarray], data_file=None, window=None):
+        layout = []
+        size = 0
+        for name, array in arrays.items():
+            layout.append((name, array.dtype.str, size, array.shape))
+            size += -(-array.nbytes // SharedArrays.ALIGNMENT) * SharedArrays.ALIGNMENT
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for (name, dtype, offset, shape), array in zip(layout, arrays.values()):
+            np.ndarray(shape, dtype=dtype, buffer=self._shm.buf, offset=offset)[:] = array
+
+        self.handle = SharedDataHandle(self._shm.name, layout, data_file, window)
+        atexit.register(self.close)
+
+    def close(self):
+        ''' Remove shared memory segment - processes which are attached to it keep their mapping '''
+        if self._shm is not None:
+            atexit.unregister(self.close)
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class SharedData(SharedArrays):
+    def __init__(self, data_manager: dm.DataManager):
+        ''' Publish currently loaded data of data manager into new shared memory segment '''
+        if data_manager.data is None:
+            raise ValueError('[SharedData] Data manager has no loaded data')
+        super().__init__(SharedData._get_columns(data_manager.data), data_manager.data_file, data_manager.window)
+
+    @staticmethod
+    def _get_columns(data):
+        columns = {}
+        for name in data.columns:
+            column = data[name]
+            if pd.api.types.is_datetime64_any_dtype(column.dtype):
+                column = np.asarray(column).astype('datetime64[ns]')
+            elif pd.api.types.is_numeric_dtype(column.dtype):
+                column = np.asarray(column)
+            else:
+                raise TypeError("[SharedData] Column '{}' of type '{}' cannot be shared".format(name, column.dtype))
+            columns[str(name)] = column
+        return columns
+
+
+# segments attached in this process - mapping must stay open as long as arrays created over it may be used
+_attached = {}
+
+def open_arrays(handle: SharedDataHandle) -> Dict[str, np.ndarray]:
+    ''' Returns dict of read-only arrays over published segment (zero copy) '''
+    shm = _attached.get(handle.name)
+    if shm is None:
+        try:
+            # process which only attaches must not track (and remove) the segment, owner takes care of it
+            shm = shared_memory.SharedMemory(name=handle.name, track=False)
+        except TypeError:
+            # before Python 3.13 attaching cannot be untracked - it is harmless for child processes
+            # (e.g. process pool workers), which share resource tracker of the parent process
+            shm = shared_memory.SharedMemory(name=handle.name)
+        _attached[handle.name] = shm
+
+    arrays = {}
+    for name, dtype, offset, shape in handle.columns:
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        array.flags.writeable = False
+        arrays[name] = array
+    return arrays
+
+def open_shared(handle: SharedDataHandle) -> dm.ArrayFrame:
+    ''' Returns read-only ArrayFrame over published data (zero copy) '''
+    return dm.ArrayFrame(open_arrays(handle))
+
+def attach(handle: SharedDataHandle, data_manager: dm.DataManager = None) -> None:
+    ''' Set published data as loaded data of data manager (dm.data by default) '''
+    data_manager = dm.data if data_manager is None else data_manager
+    data_manager.data = open_shared(handle)
+    data_manager.data_file = handle.data_file
+    data_manager.backend = 'shared'
+    data_manager.window = handle.window
+    data_manager._time_index = None
+
+def attach_all(data_handle: SharedDataHandle, tick_data_handle: SharedDataHandle = None) -> None:
+    ''' Attach published data to dm.data and dm.tick_data - convenient as process pool initializer '''
+    attach(data_handle, dm.data)
+    if tick_data_handle is not None:
+        attach(tick_data_handle, dm.tick_data)
@@ -8,7 +8,7 @@ import numpy as np
 import pandas as pd
 
 import data_manager as dm
-from visualizations import DataSourceInteraface, VisualizationParams
+from visualization_interface import DataSourceInteraface, VisualizationParams
 from utils import *
 
 class CommonParams:
@@ -83,7 +83,7 @@ class TraderOrderDataSourceWrapper(DataSourceInteraface):
 
             if order.status == OrderStatus.PENDING:
 
-                data_idx = get_idx_from_time_and_hint(time, self.data, self.trader.data_idx)
+                data_idx = self.data.get_idx_from_time_and_hint(time, self.trader.data_idx)
                 for idx in range(data_idx-n+1, data_idx+1):
                     output[idx, orders_num] = order.open_price
             else:
@@ -91,12 +91,9 @@ class TraderOrderDataSourceWrapper(DataSourceInteraface):
                 close_price = self.trader.current_price if order.status == OrderStatus.ACTIVE else order.close_price
                 close_time = self.trader.current_time if order.status == OrderStatus.ACTIVE else order.close_time
                 
-                data_idx = get_idx_from_time_and_hint(time, self.data, self.trader.data_idx)
-                time_unit = pd.Timedelta(self.data.Date[data_idx] - self.data.Date[data_idx-1]).total_seconds()
-                open_idx = self.trader.data_idx - int(pd.Timedelta(self.data.Date[data_idx] - order.open_time).total_seconds() / time_unit) # best guess
-                open_idx = get_idx_from_time_and_hint(order.open_time, self.data, open_idx)
-                close_idx = self.trader.data_idx - int(pd.Timedelta(self.data.Date[data_idx] - close_time).total_seconds() / time_unit) # best guess
-                close_idx = get_idx_from_time_and_hint(close_time, self.data, close_idx)
+                data_idx = self.data.get_idx_from_time_and_hint(time, self.trader.data_idx)
+                open_idx = self.data.get_idx_from_time_and_hint(order.open_time, data_idx)
+                close_idx = self.data.get_idx_from_time_and_hint(close_time, data_idx)
                 N = max(1, close_idx - open_idx)
 
                 if data_idx - close_idx > n:
@@ -116,6 +113,12 @@ class SystemTrader():
     ''' System trader is a wrapper around User trader which provides all neccessary 
         methods for trader to be integrated in simulation '''
 
+    ''' Number of bars before initial frame used to initialize trader (if lookback is not declared) '''
+    WARMUP = 1
+
+    ''' Number of bars trader reads (None - whole history), see SystemIndicator.LOOKBACK '''
+    LOOKBACK = None
+
     def __init__(self, name="trader", parameters: Dict = {}):
         
         self.parameters = CommonParams()
@@ -157,11 +160,19 @@ class SystemTrader():
             setattr(self, name, value)
 
     # TODO: Obsidian
-    def set_depending_indicators(self, indicators: List):
+    def set_depending_indicators(self, indicators: Dict):
+        ''' Indicators keyed by dependency name - shared indicator can have different name in every dependent '''
         self.depending_indicators = indicators
-        for indicator in self.depending_indicators:
+        for name, indicator in self.depending_indicators.items():
             # TODO: check if indicator name already exists
-            setattr(self, indicator.name, indicator)
+            setattr(self, name, indicator)
+
+    def get_lookback(self):
+        return getattr(self, 'lookback', self.LOOKBACK)
+
+    def get_warmup(self):
+        lookback = self.get_lookback()
+        return self.WARMUP if lookback is None else lookback
 
     def get_buy_vis_params(self):
         return [self.parameters.visualization[0]]
@@ -294,16 +305,17 @@ class SystemTrader():
             data_idx -= 1
         
 
-    def init(self, init_idx, n=1):
+    def init(self, init_idx, n=None):
+        if n is None:
+            n = self.get_warmup()
         self.profit = np.zeros((self.data.shape[0], 1))
         self.profit[:] = np.nan
         self.profit[0:init_idx+1] = 0.0
 
         init_start_idx = max(1, init_idx-n)
         for index in range(init_start_idx, init_idx+1):
-            input_data = self.data[0:index+1]
             # reverse order - first in list is latest data
-            input_data.reverse()
+            input_data = dm.DataView(self.data, index).window(self.get_lookback())
             self.initialize(input_data)
 
         self.data_idx = init_idx
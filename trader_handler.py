@@ -28,14 +28,21 @@ class TraderHandler:
         self.account_balance = None # initialized at set_init_frame
         
 
+    @property
+    def warmup(self):
+        ''' Number of bars before initial frame needed to initialize traders '''
+        return max([trader.get_warmup() for trader in self.traders.values()], default=SystemTrader.WARMUP)
+
     # must be called before add_trader to set init data_idx
     def set_init_frame(self, data_idx):
+        ''' Traders which are already added are initialized again (e.g. data was reloaded with more warmup bars) '''
         self.account_balance = np.zeros((self.data.shape[0], 1))
         self.account_balance[:] = np.nan
         self.data_idx = data_idx
         self.account_balance[0:self.data_idx+1] = self.start_balance
+        for trader in self.traders.values():
+            trader.init(self.data_idx)
 
-    # TODO: check for circular dependencies
     def add_trader(self, trader_name: str, trader_module: str, trader_parameters: Dict):
         print("[TraderHandler] Adding trader '{}' from {}".format(trader_name, trader_module))
 
@@ -50,11 +57,12 @@ class TraderHandler:
         if len(trader_parameters) > len(default_parameters):
             raise ValueError("[TraderHandler] Invalid parameters: ", set(trader_parameters) - set(default_parameters))
 
-        depedency_indicators = []
+        # dependencies are nodes of indicator handler graph - indicator shared by several traders is added once
+        depedency_indicators = OrderedDict()
         for dependency_name, dependency in trader_def.dependencies.items():
             # TODO: try catch in case dependency is missing required fields
-            dependency_indicator = self.indicator_handler.add_indicator(dependency_name, dependency['indicator'], dependency['parameters'], self.data_idx)
-            depedency_indicators.append( dependency_indicator )
+            dependency_indicator = self.indicator_handler.add_indicator(dependency_name, dependency['indicator'], dependency['parameters'])
+            depedency_indicators[dependency_name] = dependency_indicator
 
         trader = trader_def.trader_class(trader_name, trader_parameters)
         trader.set_depending_indicators(depedency_indicators)
@@ -66,23 +74,12 @@ class TraderHandler:
 
     def update(self, framedata):
         self.data_idx = framedata.core_data_idx
-        input_data = self.data[0:self.data_idx+1]
-        input_data.reverse()
-
-        # TODO: BENCHMARK
-        if framedata.curr_candle is not None:
-            current_candle = pd.DataFrame({'Date':  framedata.curr_candle.Date,
-                                           'Open':  framedata.curr_candle.Open,
-                                           'High':  framedata.curr_candle.High,
-                                           'Low':   framedata.curr_candle.Low,
-                                           'Close': framedata.curr_candle.Close},  index=[0])
-            # add current candle to input data at index=0
-            input_data = dm.DataView(input_data[1::], current_candle)
-        else:
-            input_data = dm.DataView(input_data)
+        # index 0 is the latest bar, current candle (if any) replaces it
+        input_data = dm.DataView(self.data, self.data_idx, framedata.curr_candle)
 
         for trader in self.traders.values():
-            trader.update(input_data, self.data_idx)
+            # trader with declared lookback gets input data bounded to it
+            trader.update(input_data.window(trader.get_lookback()), self.data_idx)
 
         # update balance
         self.account_balance[self.data_idx] = self._get_balance(self.data_idx)
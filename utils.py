@@ -1,3 +1,5 @@
+import hashlib
+import os
 from importlib import util
 
 class FrameData:
@@ -24,48 +26,58 @@ class Candle:
 
 def get_idx_from_time(data, time, op='EQUAL'):
     ''' 
-    Get row index from given data and time - this function is costly so it should not be frequently used.
-    Data should be pandas DataFrame with 'Date' as one of the columns
+    Get row index from given data and time - binary search over sorted time index of data.
+    Data should be DataManager
     op parameter can be EQUAL, GREATER_OR_EQUAL or LESS_OR_EQUAL - to search for appropriate idx
     '''
-    if op == 'EQUAL':
-        return data[data['Date'] == time].index[0]
-    elif op == 'GREATER_OR_EQUAL':
-        return data[data['Date'] >= time].index[0]
-    elif op == 'LESS_OR_EQUAL':
-        return data[data['Date'] <= time].index[-1]
-    else:
-        raise ValueError('op parameter value must be one of the following: '
-        '[\'EQUAL\', \'GREATER_OR_EQUAL\', \'LESS_OR_EQUAL\'')
+    return data.get_idx_from_time(time, op)
 
 def get_idx_from_time_and_hint(time, data, curr_idx):
-    last_time = data.Date[curr_idx]
-    step = 0
-    if last_time < time: step = 1
-    elif last_time > time: step = -1
-    data_idx = curr_idx + step
-
-    while (step > 0 and data.Date[data_idx] <= time) or \
-          (step < 0 and data.Date[data_idx] >= time):
-        data_idx += step
-    data_idx -= step
-
-    return data_idx
+    ''' Get index of last row at or before given time, search starts from curr_idx. Data should be DataManager '''
+    return data.get_idx_from_time_and_hint(time, curr_idx, op='LESS_OR_EQUAL')
 
-def import_module(module: str):
+def get_module_spec(module: str):
+    ''' Module can be given as path to .py file or as module name '''
     from os.path import abspath
 
     if module.endswith('.py'):
         module = abspath(module)
         module_name = module.split('/')[-1].rstrip('.py')
-        spec = util.spec_from_file_location(module_name, module)
+        return util.spec_from_file_location(module_name, module)
     else:
-        spec = util.find_spec(module)
+        return util.find_spec(module)
 
+def import_module(module: str):
+    spec = get_module_spec(module)
     mod = util.module_from_spec(spec)
     spec.loader.exec_module(mod)
     return mod
 
+def get_module_hash(module: str, parameters=None):
+    '''
+    Returns hash of module source together with sources of its dependencies and resolved parameters
+    (module defaults updated with given parameters, the same way as indicator and trader handlers do)
+    '''
+    h = hashlib.blake2b(digest_size=20)
+    with open(get_module_spec(module).origin, 'rb') as f:
+        h.update(f.read())
+
+    mod = import_module(module)
+    resolved_parameters = dict(getattr(mod, 'parameters', {}))
+    resolved_parameters.update(parameters or {})
+    for dependency in getattr(mod, 'dependencies', {}).values():
+        h.update(get_module_hash(dependency['indicator'])[0].encode())
+    return h.hexdigest(), resolved_parameters
+
+def get_core_hash(modules):
+    ''' Returns hash of sources of given simulator modules (module names, e.g. 'core_simulator') '''
+    h = hashlib.blake2b(digest_size=20)
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for module in modules:
+        with open(os.path.join(directory, module + '.py'), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
 def to_dict(obj):
         d = {}
         for member in dir(obj):
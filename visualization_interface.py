@@ -0,0 +1,18 @@
+import numpy as np
+
+'''
+Interface between simulation objects (indicators, traders) and visualization.
+It does not depend on GUI framework, so simulation can run without it (headless).
+'''
+
+class DataSourceInteraface:
+    def get_data(self, time, n: int) -> np.ndarray: # data is arranged in columns
+        """ Get data which corresponds to time and (n-1) previous data samples (n data samples in total) """
+
+class VisualizationParams:
+    TYPE = 'Line'
+    STYLE = 'Solid'
+    COLOR = '#1f77b4'
+    WIDTH = 2
+    SIZE = 12
+    subplot = False
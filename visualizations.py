@@ -11,21 +11,10 @@ from PyQt5.QtCore import Qt, QRectF, QPointF, QLineF
 from PyQt5.QtGui import QPen, QBrush, QColor, QPainterPath, QPainter, QTransform, QFont
 
 import data_manager as dm
+from visualization_interface import DataSourceInteraface, VisualizationParams
 from utils import *
 
 
-class DataSourceInteraface:
-    def get_data(self, time, n: int) -> np.ndarray: # data is arranged in columns
-        """ Get data which corresponds to time and (n-1) previous data samples (n data samples in total) """
-
-class VisualizationParams:
-    TYPE = 'Line'
-    STYLE = 'Solid'
-    COLOR = '#1f77b4'
-    WIDTH = 2
-    SIZE = 12
-    subplot = False
-
 class CandleItem(QGraphicsItem):
     def __init__(self, idx, open, high, low, close, width=0.8, color_up=Qt.green, color_down=Qt.red):
         super().__init__()